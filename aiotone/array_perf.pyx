@@ -2,6 +2,77 @@ import cython
 
 from cpython cimport array
 
+
+cdef extern from *:
+    """
+    #include <string.h>
+
+    /* Store the sum of each channel of `count` interleaved samples in `sums`.
+       When a whole number of frames fits in 16 floats, blocks of 16 are summed
+       side by side, which vectorizes, and folded into channels at the end. */
+    static void sum_channels(
+        const float *samples, int count, int channels, float *sums
+    ) {
+        float lanes[16] = {0};
+        int i = 0;
+        int ch;
+        if (16 % channels == 0) {
+            for (; i + 16 <= count; i += 16) {
+                for (ch = 0; ch < 16; ch++) {
+                    lanes[ch] += samples[i + ch];
+                }
+            }
+        }
+        for (ch = 0; ch < channels; ch++) {
+            sums[ch] = 0.0f;
+        }
+        if (i) {
+            for (ch = 0; ch < 16; ch++) {
+                sums[ch % channels] += lanes[ch];
+            }
+        }
+        for (; i < count; i += channels) {
+            for (ch = 0; ch < channels; ch++) {
+                sums[ch] += samples[i + ch];
+            }
+        }
+    }
+
+    /* Copy channels `in_l` and `in_r` of `count` interleaved samples to channels
+       `out_l` and `out_r` of `out`, silencing the remaining channels.  Adjacent
+       channel pairs move as one 8-byte copy per frame, and a stereo stream passed
+       straight through is a single memcpy. */
+    static void route_frames(
+        const float *in, float *out, int count, int channels,
+        int in_l, int in_r, int out_l, int out_r
+    ) {
+        int i;
+        if (in_r == in_l + 1 && out_r == out_l + 1) {
+            if (channels == 2) {
+                memcpy(out, in, count * sizeof(float));
+                return;
+            }
+            memset(out, 0, count * sizeof(float));
+            for (i = 0; i < count; i += channels) {
+                memcpy(out + i + out_l, in + i + in_l, 2 * sizeof(float));
+            }
+            return;
+        }
+        memset(out, 0, count * sizeof(float));
+        for (i = 0; i < count; i += channels) {
+            out[i + out_l] = in[i + in_l];
+            out[i + out_r] = in[i + in_r];
+        }
+    }
+    """
+    void sum_channels(
+        const float *samples, int count, int channels, float *sums
+    ) noexcept nogil
+    void route_frames(
+        const float *in_, float *out, int count, int channels,
+        int in_l, int in_r, int out_l, int out_r
+    ) noexcept nogil
+
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.nonecheck(False)
@@ -67,4 +138,40 @@ def record_audio(
         out_buffer_raw[out_offset] = in_buffer_raw[in_offset + in_l]
         out_buffer_raw[out_offset + 1] = in_buffer_raw[in_offset + in_r]
         in_offset += in_channel_count
-        out_offset += 2
\ No newline at end of file
+        out_offset += 2
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.nonecheck(False)
+def route_audio(
+    const float[::1] in_buffer not None,
+    int in_l,
+    int in_r,
+    array.array out_buffer not None,
+    int out_l,
+    int out_r,
+    array.array channel_sum not None
+) -> None:
+    """Like `move_audio()` but `channel_sum` receives plain sums of this buffer.
+
+    `in_buffer` can be any float32 buffer, including read-only ones like a "f" cast
+    of the bytes miniaudio passes to a stream, so it doesn't need to be copied into
+    an array first. All of `in_buffer` is routed.
+    """
+    cdef int ch_len = len(channel_sum)
+    cdef int in_len = in_buffer.shape[0]
+    cdef const float *in_buffer_raw = &in_buffer[0] if in_len else NULL
+    cdef float *out_buffer_raw = out_buffer.data.as_floats
+    cdef float *channel_sum_raw = channel_sum.data.as_floats
+
+    if in_len > len(out_buffer) or in_len % ch_len:
+        raise ValueError("in_buffer must hold whole frames that fit out_buffer")
+    if not (0 <= min(in_l, in_r, out_l, out_r) and max(in_l, in_r, out_l, out_r) < ch_len):
+        raise ValueError(f"channels must be between 0 and {ch_len - 1}")
+
+    with nogil:
+        sum_channels(in_buffer_raw, in_len, ch_len, channel_sum_raw)
+        route_frames(
+            in_buffer_raw, out_buffer_raw, in_len, ch_len, in_l, in_r, out_l, out_r
+        )
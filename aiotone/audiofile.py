@@ -2,16 +2,16 @@
 from __future__ import annotations
 
 from functools import partial
-import os
+import json
 from pathlib import Path
 import subprocess
 import sys
 import tempfile
-from typing import TYPE_CHECKING, Callable
+from typing import TYPE_CHECKING, Callable, Iterator, NoReturn
 
+import numpy as np
 import soundfile as sf
 
-
 stderr = sys.stderr
 
 
@@ -42,61 +42,134 @@ def read(path: Path, quiet: bool = False) -> tuple[npt.NDArray, int]:
     else:
         return data, rate
 
-    ntf = tempfile.NamedTemporaryFile(suffix=".aiff")
-    out_path = Path(ntf.name)
-    ntf.close()
-    convert_message: Callable[[], None] = partial(
+    rate, _, blocks = ffmpeg_blocks(path, 1.0, exc, quiet)
+    data = list(blocks)
+    if not data:
+        return np.zeros(0), rate
+
+    return np.concatenate(data), rate
+
+
+def read_blocks(
+    path: Path, duration: float = 0.4, quiet: bool = False
+) -> tuple[int, int, Iterator[npt.NDArray]]:
+    """Return a tuple with the sample rate, the channel count, and an iterator over
+    blocks of samples.
+
+    Like `read()` but only `duration` seconds of samples are in memory at a time.
+    """
+    try:
+        info = sf.info(path)
+    except RuntimeError as exc:
+        return ffmpeg_blocks(path, duration, exc, quiet)
+
+    rate = info.samplerate
+    return rate, info.channels, sf.blocks(path, blocksize=round(rate * duration))
+
+
+def ffmpeg_blocks(
+    path: Path, duration: float, exc: Exception, quiet: bool = False
+) -> tuple[int, int, Iterator[npt.NDArray]]:
+    """Like `read_blocks()` for files SoundFile can't read, decoded by ffmpeg.
+
+    The samples are piped from ffmpeg as they're decoded, without a temporary file.
+    If ffmpeg isn't installed or fails, `exc` is raised.
+    """
+    decode_message: Callable[[], None] = partial(
         print,
-        f"Converting {path} to {out_path.name}... ",
+        f"Decoding {path} with ffmpeg... ",
         end="",
         flush=True,
         file=stderr,
     )
     if not quiet:
-        convert_message()
-        convert_message = empty
-    try:
-        subprocess.run(
-            [
-                "ffmpeg",
-                "-i",
-                str(path),
-                "-vn",
-                "-c:v",
-                "copy",
-                "-c:a",
-                "pcm_s16be",
-                "-y",
-                str(out_path),
-            ],
-            check=True,
-            capture_output=True,
-        )
-    except subprocess.CalledProcessError as cpe:
-        convert_message()
+        decode_message()
+        decode_message = empty
+
+    def failed(cmd: list[str], out: bytes, err: bytes) -> NoReturn:
+        decode_message()
         print("failed.", file=stderr)
-        for word in cpe.cmd:
+        for word in cmd:
             if " " in word:
                 word = f'"{word}"'
             print(word, end=" ", file=stderr)
         print()
-        if cpe.stdout.strip():
-            print(cpe.stdout.decode(), file=stderr)
-        if cpe.stderr.strip():
-            print(cpe.stderr.decode(), file=stderr)
+        if out.strip():
+            print(out.decode(), file=stderr)
+        if err.strip():
+            print(err.decode(), file=stderr)
         raise exc from None
-    except FileNotFoundError:
-        convert_message()
+
+    def not_installed() -> NoReturn:
+        decode_message()
         print("failed; ffmpeg not installed.", file=stderr)
         raise exc from None
+
+    probe_cmd = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-select_streams",
+        "a:0",
+        "-show_entries",
+        "stream=sample_rate,channels",
+        "-of",
+        "json",
+        str(path),
+    ]
     try:
-        data, rate = sf.read(out_path)
-    except RuntimeError:
-        convert_message()
-        print("failed.", file=stderr)
-        raise exc from None
-    else:
+        probe = subprocess.run(probe_cmd, check=True, capture_output=True)
+        stream = json.loads(probe.stdout)["streams"][0]
+        rate = int(stream["sample_rate"])
+        channels = int(stream["channels"])
+    except subprocess.CalledProcessError as cpe:
+        failed(cpe.cmd, cpe.stdout, cpe.stderr)
+    except (LookupError, ValueError):  # no audio stream
+        failed(probe_cmd, probe.stdout, probe.stderr)
+    except FileNotFoundError:
+        not_installed()
+
+    cmd = [
+        "ffmpeg",
+        "-nostdin",
+        "-v",
+        "error",
+        "-i",
+        str(path),
+        "-vn",
+        "-ac",
+        str(channels),
+        "-ar",
+        str(rate),
+        "-f",
+        "f64le",
+        "-",
+    ]
+    # Messages go to a file rather than a second pipe: nothing reads that pipe while
+    # the samples stream in, so plenty of warnings would fill it up and block ffmpeg
+    # forever.
+    errors = tempfile.TemporaryFile()
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errors)
+    except FileNotFoundError:
+        errors.close()
+        not_installed()
+
+    def blocks() -> Iterator[npt.NDArray]:
+        # Same layout as SoundFile returns: frames by channels, mono is 1-D.
+        shape = (-1, channels) if channels > 1 else (-1,)
+        frame_size = 8 * channels
+        block_size = frame_size * max(1, round(rate * duration))
+        with proc, errors:
+            assert proc.stdout is not None
+            while chunk := proc.stdout.read(block_size):
+                frames = len(chunk) // frame_size
+                data = np.frombuffer(chunk, dtype="<f8", count=frames * channels)
+                yield data.reshape(shape)
+            if proc.wait():
+                errors.seek(0)
+                failed(cmd, b"", errors.read())
         if not quiet:
             print("success.", file=stderr)
-        os.unlink(out_path)
-        return data, rate
+
+    return rate, channels, blocks()
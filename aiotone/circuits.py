@@ -9,7 +9,11 @@ from typing import List, Optional, Tuple
 
 from attr import dataclass, Factory
 import click
-import uvloop
+
+try:
+    from uvloop import run as run_event_loop
+except ImportError:  # uvloop doesn't support Windows
+    from asyncio import run as run_event_loop
 
 from .metronome import Metronome
 from .midi import (
@@ -92,8 +96,7 @@ def main() -> None:
 
     - start the program.  Press Play on the Circuit.
     """
-    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
-    asyncio.run(async_main())
+    run_event_loop(async_main())
 
 
 async def async_main() -> None:
@@ -4,9 +4,21 @@ from array import array
 FMAudio = Generator[array[int], array[int], None]
 
 def saturate(value: float) -> int: ...
+def enable_flush_to_zero() -> bool: ...
 def calculate_panning(
     pan: float, mono: array[int], stereo: array[int], want_frames: int
 ) -> None: ...
+def calculate_auto_panning(
+    mono: array[int], panning: array[int], stereo: array[int], want_frames: int
+) -> None: ...
+def pan_gains(pan: float, gain: float = 1.0) -> tuple[float, float]: ...
+def mix_stereo(
+    monos: list[array[int]],
+    gains: list[tuple[float, float]],
+    out: array[float],
+    frames: int,
+    count: int = -1,
+) -> None: ...
 def filter_array(input: array[int], window: int) -> array[int]: ...
 
 class Envelope:
@@ -25,7 +37,7 @@ class Operator:
         volume: float = 1.0,  # 0.0 - 1.0; relative attenuation
         pitch: float = 440.0,  # Hz
     ) -> None: ...
-    # Current state of the operator, modified during `mono_out()`
+    # Current state of the operator, modified during `render()`
     current_velocity: float = 0.0
     reset: bool = False
     def is_silent(self) -> bool: ...
@@ -33,6 +45,30 @@ class Operator:
     def note_off(self, pitch: float, volume: float) -> None: ...
     def pitch_bend(self, semitones: float) -> None: ...
     def mono_out(self) -> FMAudio: ...
+    def render(
+        self, out_buffer: array[int], modulator: array[int] | None, frames: int
+    ) -> None: ...
     def modulate(
-        self, out_buffer: array[int], modulator: array[int], w_i: int
+        self,
+        out_buffer: array[int],
+        modulator: array[int] | None,
+        phase: int,
+        frames: int = -1,
     ) -> int: ...
+
+def render_algorithm(
+    algorithm: int,
+    op1: Operator,
+    op2: Operator,
+    op3: Operator,
+    op4: Operator,
+    buffers: tuple[array[int], ...],
+    frames: int,
+) -> array[int]: ...
+def render_voices(
+    voices: list[Any],
+    active: bytearray,
+    gains: tuple[tuple[float, float], ...],
+    out: array[float],
+    frames: int,
+) -> int: ...
@@ -1,16 +1,20 @@
 DEF INT16_MAXVALUE = 32767
 DEF MAX_BUFFER = 2400  # 5 ms at 48000 Hz
+DEF PAN_EPSILON = 1e-9
+DEF ENVELOPE_BLOCK = 256  # envelope values computed ahead by `Operator._render`
+DEF MIX_BLOCK = 256  # frames summed on the stack at a time by `mix_stereo`
 
 cimport cython
-from libc.stdint cimport int16_t, int32_t
-from libc.math cimport floor, lround
+from libc.stdint cimport int16_t, int32_t, int64_t, uint32_t
+from libc.math cimport fabs, lround
+from libc.string cimport memset
 
 from cpython cimport array
 import array
 from cymem.cymem cimport Pool
 
 
-cpdef int16_t saturate(double value):
+cpdef int16_t saturate(double value) noexcept nogil:
     """Constrain `value` between -INT16_MAXVALUE and INT16_MAXVALUE."""
     cdef int32_t ival = <int32_t>value
     if ival > INT16_MAXVALUE:
@@ -20,6 +24,161 @@ cpdef int16_t saturate(double value):
     return <int16_t>ival
 
 
+cdef extern from *:
+    """
+    #if defined(__AVX2__)
+    #include <immintrin.h>
+    #elif defined(__SSSE3__)
+    #include <tmmintrin.h>
+    #elif defined(__SSE2__)
+    #include <emmintrin.h>
+    #elif defined(__ARM_NEON)
+    #include <arm_neon.h>
+    #endif
+
+    /* Make the calling thread treat denormal floats as zero, both as inputs (DAZ)
+       and as results (FTZ).  Returns whether this CPU supports it. */
+    static int set_flush_to_zero(void) {
+    #if defined(__SSE2__)
+        _mm_setcsr(_mm_getcsr() | 0x8040);
+        return 1;
+    #elif defined(__aarch64__)
+        unsigned long long fpcr;
+        __asm__ __volatile__("mrs %0, fpcr" : "=r"(fpcr));
+        __asm__ __volatile__("msr fpcr, %0" : : "r"(fpcr | (1ULL << 24)));
+        return 1;
+    #else
+        return 0;
+    #endif
+    }
+
+    /* Saturating int16 add of as many whole 8-sample vectors as fit in `n`.
+       The hardware saturates to -32768, so the result is additionally clamped
+       to -32767 to match `saturate()`.  Returns the number of samples done. */
+    static int simd_saturate_add(const short *a, const short *b, short *out, int n) {
+        int i = 0;
+    #if defined(__SSE2__)
+        const __m128i floor = _mm_set1_epi16(-32767);
+        for (; i + 8 <= n; i += 8) {
+            __m128i sum = _mm_adds_epi16(
+                _mm_loadu_si128((const __m128i *)(a + i)),
+                _mm_loadu_si128((const __m128i *)(b + i))
+            );
+            _mm_storeu_si128((__m128i *)(out + i), _mm_max_epi16(sum, floor));
+        }
+    #elif defined(__ARM_NEON)
+        const int16x8_t floor = vdupq_n_s16(-32767);
+        for (; i + 8 <= n; i += 8) {
+            int16x8_t sum = vqaddq_s16(vld1q_s16(a + i), vld1q_s16(b + i));
+            vst1q_s16(out + i, vmaxq_s16(sum, floor));
+        }
+    #endif
+        return i;
+    }
+
+    /* Expand as many whole 8-frame chunks of `mono` as fit in `n` to interleaved
+       `stereo`, scaled by the Q15 gains `left` and `right`.  Both SSSE3's
+       `pmulhrsw` and NEON's `vqrdmulh` compute (a * b + 0x4000) >> 15, exactly
+       like the scalar loop.  Returns the number of frames done. */
+    static int simd_pan_expand(
+        const short *mono, short left, short right, short *stereo, int n
+    ) {
+        int i = 0;
+    #if defined(__SSSE3__)
+        const __m128i l = _mm_set1_epi16(left);
+        const __m128i r = _mm_set1_epi16(right);
+        for (; i + 8 <= n; i += 8) {
+            __m128i m = _mm_loadu_si128((const __m128i *)(mono + i));
+            __m128i ml = _mm_mulhrs_epi16(m, l);
+            __m128i mr = _mm_mulhrs_epi16(m, r);
+            _mm_storeu_si128((__m128i *)(stereo + 2 * i), _mm_unpacklo_epi16(ml, mr));
+            _mm_storeu_si128(
+                (__m128i *)(stereo + 2 * i + 8), _mm_unpackhi_epi16(ml, mr)
+            );
+        }
+    #elif defined(__ARM_NEON)
+        const int16x8_t l = vdupq_n_s16(left);
+        const int16x8_t r = vdupq_n_s16(right);
+        for (; i + 8 <= n; i += 8) {
+            int16x8_t m = vld1q_s16(mono + i);
+            int16x8x2_t lr;
+            lr.val[0] = vqrdmulhq_s16(m, l);
+            lr.val[1] = vqrdmulhq_s16(m, r);
+            vst2q_s16(stereo + 2 * i, lr);
+        }
+    #endif
+        return i;
+    }
+
+    /* Like `simd_pan_expand()` but with a per-frame `panning` signal where
+       -32767 is hard left and 32767 is hard right.  Handles 4 frames at a time
+       in double precision, like the scalar loop in `calculate_auto_panning()`,
+       and scales `panning` by a reciprocal rather than dividing. */
+    static int simd_auto_pan_expand(
+        const short *mono, const short *panning, short *stereo, int n
+    ) {
+        int i = 0;
+    #if defined(__AVX2__)
+        const __m256d one = _mm256_set1_pd(1.0);
+        const __m256d half = _mm256_set1_pd(0.5);
+        const __m256d inv_max = _mm256_set1_pd(1.0 / 32767.0);
+        for (; i + 4 <= n; i += 4) {
+            __m256d m = _mm256_cvtepi32_pd(
+                _mm_cvtepi16_epi32(_mm_loadl_epi64((const __m128i *)(mono + i)))
+            );
+            __m256d pan = _mm256_mul_pd(
+                _mm256_cvtepi32_pd(
+                    _mm_cvtepi16_epi32(_mm_loadl_epi64((const __m128i *)(panning + i)))
+                ),
+                inv_max
+            );
+            __m128i l = _mm256_cvttpd_epi32(
+                _mm256_mul_pd(_mm256_mul_pd(_mm256_sub_pd(one, pan), half), m)
+            );
+            __m128i r = _mm256_cvttpd_epi32(
+                _mm256_mul_pd(_mm256_mul_pd(_mm256_add_pd(pan, one), half), m)
+            );
+            _mm_storeu_si128(
+                (__m128i *)(stereo + 2 * i),
+                _mm_packs_epi32(_mm_unpacklo_epi32(l, r), _mm_unpackhi_epi32(l, r))
+            );
+        }
+    #endif
+        return i;
+    }
+    """
+    int set_flush_to_zero() noexcept nogil
+    int simd_saturate_add(
+        const short *a, const short *b, short *out, int n
+    ) noexcept nogil
+    int simd_pan_expand(
+        const short *mono, short left, short right, short *stereo, int n
+    ) noexcept nogil
+    int simd_auto_pan_expand(
+        const short *mono, const short *panning, short *stereo, int n
+    ) noexcept nogil
+
+
+cpdef bint enable_flush_to_zero():
+    """Flush denormal floats to zero on the calling thread.
+
+    Denormals show up when envelopes and filters decay towards silence, and each
+    operation on them can cost a hundred times more than on a normal float. Call
+    this on the audio thread. Returns False if the CPU isn't supported.
+    """
+    return set_flush_to_zero()
+
+
+cdef inline int16_t clip16(int32_t value) noexcept nogil:
+    """Integer-only `saturate()` for sums of int16 samples."""
+    if value > INT16_MAXVALUE:
+        return INT16_MAXVALUE
+    if value < -INT16_MAXVALUE:
+        return -INT16_MAXVALUE
+    return <int16_t>value
+
+
+@cython.cdivision(True)
 cpdef calculate_panning(
     double pan,
     array.array mono,
@@ -29,18 +188,221 @@ cpdef calculate_panning(
     """Convert `mono` signal to `stereo` using the static `pan` ratio.
     
     pan = -1.0 is hard left. pan = 0.0 is center. pan = 1.0 is hard right.
+
+    Samples are scaled in Q15 fixed point, rounding to nearest.
+    """
+    cdef int32_t i
+    cdef short *raw_mono = mono.data.as_shorts
+    cdef short *raw_stereo = stereo.data.as_shorts
+    # Q15 fixed-point gains, capped so they fit in int16 for SIMD multiplies.
+    cdef int32_t left = <int32_t>lround((-pan + 1) / 2 * 32768)
+    cdef int32_t right = min(32768 - left, INT16_MAXVALUE)
+    left = min(left, INT16_MAXVALUE)
+
+    if fabs(pan) < PAN_EPSILON:
+        # C division truncates towards zero, keeping the halves symmetrical.
+        for i in range(want_frames):
+            raw_stereo[2 * i] = raw_stereo[2 * i + 1] = raw_mono[i] // 2
+    elif fabs(pan + 1) < PAN_EPSILON:
+        for i in range(want_frames):
+            raw_stereo[2 * i] = raw_mono[i]
+            raw_stereo[2 * i + 1] = 0
+    elif fabs(pan - 1) < PAN_EPSILON:
+        for i in range(want_frames):
+            raw_stereo[2 * i] = 0
+            raw_stereo[2 * i + 1] = raw_mono[i]
+    else:
+        # SIMD handles whole vectors, the scalar loop finishes the tail.
+        i = simd_pan_expand(raw_mono, left, right, raw_stereo, want_frames)
+        while i < want_frames:
+            raw_stereo[2 * i] = <int16_t>((raw_mono[i] * left + 16384) >> 15)
+            raw_stereo[2 * i + 1] = <int16_t>((raw_mono[i] * right + 16384) >> 15)
+            i += 1
+
+
+cpdef calculate_auto_panning(
+    array.array mono,
+    array.array panning,
+    array.array stereo,
+    int32_t want_frames,
+):
+    """Convert `mono` signal to `stereo` using a sample-precise `panning` signal.
+
+    `panning` is an "h" array where -INT16_MAXVALUE is hard left, 0 is center, and
+    INT16_MAXVALUE is hard right.
     """
     cdef int32_t i
+    cdef double pan
+    cdef double inv_max = 1.0 / INT16_MAXVALUE
     cdef short *raw_mono = mono.data.as_shorts
+    cdef short *raw_panning = panning.data.as_shorts
     cdef short *raw_stereo = stereo.data.as_shorts
-    for i in range(want_frames):
+    with nogil:
+        # SIMD handles whole vectors, the scalar loop finishes the tail.
+        i = simd_auto_pan_expand(raw_mono, raw_panning, raw_stereo, want_frames)
+        while i < want_frames:
+            pan = raw_panning[i] * inv_max
             raw_stereo[2 * i] = <int16_t>((-pan + 1) / 2 * raw_mono[i])
             raw_stereo[2 * i + 1] = <int16_t>((pan + 1) / 2 * raw_mono[i])
+            i += 1
+
+
+cpdef tuple pan_gains(double pan, double gain = 1.0):
+    """Return the `(left, right)` multipliers `mix_stereo` applies to a voice at `pan`.
+
+    `pan` uses the same scale as `calculate_panning`. Both multipliers include
+    `gain` and the conversion from int16 to float32 samples, so a mixer can compute
+    them once per voice instead of once per buffer.
+    """
+    cdef double scale = gain / INT16_MAXVALUE
+    return ((-pan + 1) / 2 * scale, (pan + 1) / 2 * scale)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef mix_stereo(
+    list monos,
+    list gains,
+    array.array out,
+    int32_t frames,
+    int32_t count = -1,
+):
+    """Pan each of `monos` by the matching entry in `gains` and sum them into `out`.
+
+    Each mono signal is an "h" array holding at least `frames` samples, like a single
+    voice's output. Gains are `(left, right)` tuples as returned by `pan_gains`.
+    `out` is an "f" array which receives `frames` interleaved stereo frames as
+    float32 clipped to -1.0 - 1.0, ready for the audio device.
+
+    Only the first `count` entries of `monos` and `gains` are mixed, which lets
+    callers reuse preallocated lists. By default all of them are.
+
+    Panning and summing happen without holding the GIL and without intermediate
+    stereo buffers per voice. Voices are accumulated one at a time into per-channel
+    sums: every step of that loop is independent, so it vectorizes without the
+    shuffles a per-frame horizontal sum over voices needs. The sums cover
+    `MIX_BLOCK` frames at a time and live on the stack, so nothing proportional to
+    `frames` is allocated and they stay in L1 cache while all voices are added.
+    Sums and gains are float32 like the output, which doubles the samples per SIMD
+    register compared to doubles; int16 voices lose nothing to float32's 24-bit
+    mantissa.
+    """
+    cdef int32_t v
+    if count < 0:
+        count = len(monos)
+    if count > len(monos) or count > len(gains):
+        raise ValueError(f"expected a mono signal and gains for {count} voices")
+    if len(out) < 2 * frames:
+        raise ValueError(f"output buffer too short for {frames} frames")
+    cdef array.array mono
+    cdef tuple gain_pair
+    cdef Pool mem = Pool()
+    cdef const short **raw_monos = <const short **>mem.alloc(count, sizeof(short *))
+    cdef float *left_gains = <float *>mem.alloc(count, sizeof(float))
+    cdef float *right_gains = <float *>mem.alloc(count, sizeof(float))
+    for v in range(count):
+        mono = <array.array>monos[v]
+        if len(mono) < frames:
+            raise ValueError(f"mono signal {v} too short for {frames} frames")
+        raw_monos[v] = mono.data.as_shorts
+        gain_pair = <tuple>gains[v]
+        left_gains[v] = gain_pair[0]
+        right_gains[v] = gain_pair[1]
+
+    with nogil:
+        mix_into(raw_monos, left_gains, right_gains, count, out.data.as_floats, frames)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void mix_into(
+    const short **monos,
+    const float *left_gains,
+    const float *right_gains,
+    int32_t count,
+    float *out,
+    int32_t frames,
+) noexcept nogil:
+    """The inner loop of `mix_stereo()`."""
+    cdef int32_t i
+    cdef int32_t v
+    cdef int32_t start
+    cdef int32_t block
+    cdef const short *mono
+    cdef const short *mono2
+    cdef float left_gain
+    cdef float right_gain
+    cdef float left_gain2
+    cdef float right_gain2
+    cdef float left[MIX_BLOCK]
+    cdef float right[MIX_BLOCK]
+    for start in range(0, frames, MIX_BLOCK):
+        block = min(MIX_BLOCK, frames - start)
+        memset(left, 0, block * sizeof(float))
+        memset(right, 0, block * sizeof(float))
+        # Voices are added two at a time, which halves the loads and stores of
+        # the sums. An odd voice out is added on its own.
+        v = 0
+        while v + 2 <= count:
+            mono = monos[v] + start
+            mono2 = monos[v + 1] + start
+            left_gain = left_gains[v]
+            right_gain = right_gains[v]
+            left_gain2 = left_gains[v + 1]
+            right_gain2 = right_gains[v + 1]
+            for i in range(block):
+                left[i] += mono[i] * left_gain + mono2[i] * left_gain2
+                right[i] += mono[i] * right_gain + mono2[i] * right_gain2
+            v += 2
+        if v < count:
+            mono = monos[v] + start
+            left_gain = left_gains[v]
+            right_gain = right_gains[v]
+            for i in range(block):
+                left[i] += mono[i] * left_gain
+                right[i] += mono[i] * right_gain
+        for i in range(block):
+            out[2 * (start + i)] = (
+                1.0 if left[i] > 1.0 else -1.0 if left[i] < -1.0 else left[i]
+            )
+            out[2 * (start + i) + 1] = (
+                1.0 if right[i] > 1.0 else -1.0 if right[i] < -1.0 else right[i]
+            )
+
+
+cdef void sum_into(
+    const short **partials, int32_t count, short *out, int32_t samples
+) noexcept nogil:
+    """Sum `partials` sample by sample into `out`, saturating to the int16 range."""
+    cdef int32_t i
+    cdef int32_t v
+    cdef int32_t acc
+    for i in range(samples):
+        acc = 0
+        for v in range(count):
+            acc += partials[v][i]
+        out[i] = clip16(acc)
+
+
+cdef inline void add_into(
+    const short *a, const short *b, short *out, int32_t samples
+) noexcept nogil:
+    """Store `a + b` in `out` for `samples` samples, saturating to the int16 range.
+
+    On SSE2 and NEON it adds 8 samples at a time with the CPU's saturating add.
+    """
+    cdef int32_t i
+    # SIMD handles whole vectors, the scalar loop finishes the tail.
+    for i in range(simd_saturate_add(a, b, out, samples), samples):
+        out[i] = clip16(<int32_t>a[i] + b[i])
 
 
 @cython.cdivision(True)
 cpdef filter_array(array.array input, int window):
-    """Return a new array of the same length as `input` filtered by a linear triangle window."""
+    """Return a new array of the same length as `input` filtered by a linear triangle window.
+
+    The input wraps around like a wavetable. Results saturate to the int16 range.
+    """
     cdef Pool mem = Pool()
     cdef double* window_table = <double*>mem.alloc(window, sizeof(double))
     cdef double divisor = 0.0
@@ -62,25 +424,100 @@ cpdef filter_array(array.array input, int window):
 
     cdef short* raw_input = input.data.as_shorts
     cdef int input_len = len(input)
-    cdef array.array result = array.array("h", [0] * input_len)
-    for i in range(input_len):
-        val = 0.0
-        for j in range(window):
-            val += raw_input[modulo(i + j, input_len)] * window_table[j]
-            if j == 0:
-                continue
-            val += raw_input[modulo(i - j, input_len)] * window_table[j]
-        assert -INT16_MAXVALUE <= lround(val) <= INT16_MAXVALUE
-        result.data.as_shorts[i] = <int16_t>lround(val)
+    cdef array.array result = array.clone(input, input_len, zero=True)
+    cdef short* raw_result = result.data.as_shorts
+    # Wrap the input around by `window - 1` samples on both sides so the taps can
+    # index it directly instead of computing a modulo per tap.
+    cdef int pad = window - 1
+    cdef short* padded = <short*>mem.alloc(input_len + 2 * pad, sizeof(short))
+    for i in range(input_len + 2 * pad):
+        padded[i] = raw_input[modulo(i - pad, input_len)]
+
+    cdef short* center
+    with nogil:
+        for i in range(input_len):
+            center = &padded[i + pad]
+            val = center[0] * window_table[0]
+            for j in range(1, window):
+                val += center[j] * window_table[j]
+                val += center[-j] * window_table[j]
+            raw_result[i] = clip16(<int32_t>lround(val))
     return result
 
 
 @cython.cdivision(True)
-cdef inline modulo(int a, int b):
+cdef inline int modulo(int a, int b) noexcept nogil:
     """Python-style mod that always returns positive numbers."""
     return ((a % b) + b) % b
 
 
+@cython.cdivision(True)
+cdef uint32_t render_op(
+    const short *wave,
+    int lobits,
+    const short *modulator,
+    int n,
+    uint32_t phase,
+    uint32_t step,
+    double amplitude,
+    const double *env,
+    short *out,
+) noexcept nogil:
+    """Render `n` samples of a phase-modulated, enveloped `wave` table into `out`.
+
+    This is the entire hot path of an FM operator. `wave` holds 1 << (32 - `lobits`)
+    samples. `phase` is a 32-bit fixed-point accumulator whose top bits index `wave`
+    and whose `lobits` low bits are the fractional part used to interpolate linearly
+    between neighboring samples. It advances by `step` per sample and the updated
+    value is returned. A NULL `modulator` renders the plain, unmodulated oscillator.
+
+    Every input is a plain argument so the compiler can keep all of it in registers
+    instead of reloading object fields that might have been written through `out`.
+    """
+    cdef int i
+    cdef int16_t mod
+    cdef uint32_t mod_phase
+    cdef uint32_t index
+    cdef double triangle_factor
+    cdef int w_len = 1 << (32 - lobits)
+    cdef uint32_t w_mask = w_len - 1
+    cdef uint32_t lomask = (<uint32_t>1 << lobits) - 1
+    cdef double lo_scale = 1.0 / (<uint32_t>1 << lobits)
+
+    if modulator == NULL:
+        for i in range(n):
+            index = phase >> lobits
+            triangle_factor = (phase & lomask) * lo_scale
+            out[i] = saturate(
+                amplitude
+                * env[i]
+                * (
+                    (1.0 - triangle_factor) * wave[index]
+                    + triangle_factor * wave[(index + 1) & w_mask]
+                )
+            )
+            phase += step
+        return phase
+
+    for i in range(n):
+        mod = modulator[i]
+        # Modulation offsets the phase by whole table samples; unsigned
+        # overflow wraps around the table for free.
+        mod_phase = phase + (<uint32_t>(mod * w_len / INT16_MAXVALUE) << lobits)
+        index = mod_phase >> lobits
+        triangle_factor = (mod_phase & lomask) * lo_scale
+        out[i] = saturate(
+            amplitude
+            * env[i]
+            * (
+                (1.0 - triangle_factor) * wave[index]
+                + triangle_factor * wave[(index + 1) & w_mask]
+            )
+        )
+        phase += step
+    return phase
+
+
 cdef class Envelope:
     """A typical linear Attack-Decay-Sustain-Release envelope.
     
@@ -92,20 +529,31 @@ cdef class Envelope:
     cdef double s  # 0.0 - 1.0; relative volume
     cdef int r  # in number of samples
 
+    # Per-sample increments, precomputed so `advance()` never divides
+    cdef double attack_step
+    cdef double decay_step
+    cdef double release_step
+
     cdef bint released  # bint: Cython boolean int
     cdef int samples_since_reset
     cdef double current_value
 
     def __init__(self, int a, int d, double s, int r):
-        self.a = a
+        self.a = a or 1
         self.d = d
         self.s = s
-        self.r = r
+        self.r = r or 1
+        self.attack_step = 1.0 / self.a
+        self.decay_step = (1.0 - s) / d if d else 0.0
+        self.release_step = 1.0 / self.r
         self.released = False
         self.samples_since_reset = -1  # not flowing
         self.current_value = 0.0
 
     def reset(self):
+        self._reset()
+
+    cdef void _reset(self) noexcept nogil:
         self.released = False
         self.samples_since_reset = 0
         self.current_value = 0.0
@@ -113,14 +561,14 @@ cdef class Envelope:
     def release(self):
         self.released = True
 
-    cpdef advance(self):
+    cpdef double advance(self):
         """Move the envelope one sample forward and return its current fp value."""
+        return self._advance()
+
+    cdef double _advance(self) noexcept nogil:
         cdef double envelope = self.current_value
         cdef int samples_since_reset = self.samples_since_reset
-        cdef int a = self.a or 1
-        cdef int d = self.d
         cdef double s = self.s
-        cdef int r = self.r or 1
 
         if samples_since_reset == -1:
             return 0.0
@@ -129,16 +577,17 @@ cdef class Envelope:
         # Release
         if self.released:
             if envelope > 0:
-                envelope -= 1 / r
+                envelope -= self.release_step
             else:
                 envelope = 0.0
                 samples_since_reset = -1
-        # Attack
-        elif samples_since_reset <= a:
-            envelope += 1 / a
-        # Decay
-        elif samples_since_reset <= a + d:
-            envelope -= (1 - s) / d
+        # Attack and decay, selected without branching
+        elif samples_since_reset <= self.a + self.d:
+            envelope += (
+                self.attack_step
+                if samples_since_reset <= self.a
+                else -self.decay_step
+            )
         # Sustain
         elif s:
             envelope = s
@@ -151,38 +600,123 @@ cdef class Envelope:
         self.current_value = envelope
         return envelope
 
+    cdef void _advance_block(self, double *out, int n) noexcept nogil:
+        """Write the next `n` values of the envelope to `out`.
+
+        Silence and sustain are constant so they're filled in bulk. Attack and decay
+        are linear ramps: the length of the current stage is known up front so each
+        is written as `start + k * step` in a loop without the per-sample stage
+        checks of `_advance()`, which vectorizes. Release ends when the value
+        crosses zero, so it's accumulated step by step exactly like `_advance()`
+        does; a ramp would round differently and could end a sample apart. Values
+        match calling `_advance()` `n` times up to floating-point rounding.
+        """
+        cdef int i = 0
+        cdef int k
+        cdef int count
+        cdef int sse
+        cdef double envelope
+        cdef double step
+        while i < n:
+            sse = self.samples_since_reset
+            if sse == -1:
+                memset(&out[i], 0, (n - i) * sizeof(double))
+                return
+            envelope = self.current_value
+            if self.released:
+                if envelope <= 0:
+                    # Falls silent; let `_advance()` do the bookkeeping.
+                    out[i] = self._advance()
+                    i += 1
+                    continue
+                step = self.release_step
+                count = 0
+                while i + count < n and envelope > 0:
+                    envelope -= step
+                    out[i + count] = envelope
+                    count += 1
+                i += count
+                self.samples_since_reset = sse + count
+                self.current_value = envelope
+                continue
+            elif sse < self.a + self.d:
+                if sse < self.a:
+                    step = self.attack_step
+                    count = min(n - i, self.a - sse)
+                else:
+                    step = -self.decay_step
+                    count = min(n - i, self.a + self.d - sse)
+            elif self.s:
+                self.samples_since_reset = sse + n - i
+                self.current_value = self.s
+                while i < n:
+                    out[i] = self.s
+                    i += 1
+                return
+            else:
+                out[i] = self._advance()
+                i += 1
+                continue
+            for k in range(count):
+                out[i + k] = envelope + (k + 1) * step
+            i += count
+            self.samples_since_reset = sse + count
+            self.current_value = out[i - 1]
+
     cpdef is_silent(self):
+        return self._is_silent()
+
+    cdef bint _is_silent(self) noexcept nogil:
         return self.samples_since_reset < 0 and self.current_value == 0
 
 
 cdef class Operator:
     """A Yamaha-style FM operator which is a waveform coupled with an envelope.
 
-    Generates monophonic audio with `mono_out` which can be modulated with
-    a `modulator` array input, possibly from another Operator.
+    Generates monophonic audio with `render` (or the `mono_out` generator wrapping
+    it) which can be modulated with a `modulator` array input, possibly from
+    another Operator.
+
+    The `wave` table is treated as read-only so it can be shared between operators.
+    Its length must be a power of two: the phase is a 32-bit fixed-point accumulator
+    whose top bits index the table and whose low bits are the fractional part.
     """
 
     # See field hints in `__init__` below.
     cdef array.array wave
+    cdef int wave_len
+    cdef int lobits  # low phase bits below the table index
+    cdef double phase_factor  # phase increment per Hz
     cdef int sample_rate
     cdef Envelope envelope
     cdef double volume
     cdef double pitch
 
-    # Current state of the operator, modified during `mono_out()`
+    # Current state of the operator, modified during `render()`
     cdef double current_velocity
     cdef double current_bend
     cdef bint reset
+    cdef uint32_t phase
 
     def __init__(
         self,
-        array.array wave,  # "h" arrays assumed, which are signed 16-bit
+        array.array wave,  # "h" arrays assumed, signed 16-bit; never written to
         int sample_rate,  # Hz, like: 44100
         Envelope envelope,
         double volume = 1.0,  # 0.0 - 1.0; relative attenuation
         double pitch = 440.0,  # Hz
     ):
+        cdef int wave_len = len(wave)
+        if wave_len < 2 or wave_len & (wave_len - 1):
+            raise ValueError(f"wave length must be a power of two, got {wave_len}")
+
         self.wave = wave
+        self.wave_len = wave_len
+        self.lobits = 32
+        while wave_len > 1:
+            wave_len >>= 1
+            self.lobits -= 1
+        self.phase_factor = 4294967296.0 / sample_rate
         self.sample_rate = sample_rate
         self.envelope = envelope
         self.volume = volume
@@ -190,6 +724,7 @@ cdef class Operator:
         self.current_velocity = 0.0
         self.current_bend = 1.0
         self.reset = False
+        self.phase = 0
 
     def note_on(self, double pitch, double volume):
         self.reset = True
@@ -209,73 +744,283 @@ cdef class Operator:
 
     def mono_out(self):
         """Generate Audio, accepting other Audio for modulation purposes.
-        
-        Audio is generated with sample-precision pitch changes, and sample-precision
-        resettable envelope.
 
-        By design, the waveform is not reset until the sound is silent (passes through
-        the entire envelope).
+        A generator wrapper around `render()`, see there for details.
         """
         cdef array.array modulator
-        cdef int mod_len
         cdef array.array out_buffer = array.array("h")
-        cdef double w_i = 0.0
 
         modulator = yield out_buffer
-        mod_len = len(modulator)
-        out_buffer.extend([0] * MAX_BUFFER)
         while True:
-            w_i = self.modulate(out_buffer, modulator, w_i)
-            if self.reset:
-                self.reset = False
-                self.envelope.reset()
-            modulator = yield out_buffer[:mod_len]
-            mod_len = len(modulator)
+            # The same buffer is yielded every time, sized to exactly the modulator.
+            if len(out_buffer) != len(modulator):
+                out_buffer = array.clone(out_buffer, len(modulator), zero=True)
+            self.render(out_buffer, modulator, len(modulator))
+            modulator = yield out_buffer
+
+    cpdef render(
+        self, array.array out_buffer, array.array modulator, int32_t frames
+    ):
+        """Write `frames` samples of audio to `out_buffer`, modulated by `modulator`.
+
+        Pass None as `modulator` for an unmodulated waveform.
+
+        Audio is generated with buffer-precision pitch changes, and sample-precision
+        resettable envelope.
+
+        By design, the waveform is not reset until the sound is silent (passes through
+        the entire envelope).
+        """
+        if frames > len(out_buffer) or (
+            modulator is not None and frames > len(modulator)
+        ):
+            raise ValueError(f"buffers too short for {frames} frames")
+
+        cdef short *raw_modulator = NULL
+        if modulator is not None:
+            raw_modulator = modulator.data.as_shorts
+        with nogil:
+            self._render_frames(out_buffer.data.as_shorts, raw_modulator, frames)
+
+    cdef void _render_frames(
+        self, short *out, short *modulator, int32_t frames
+    ) noexcept nogil:
+        """`render()` after its checks, free to run without holding the GIL."""
+        if self.envelope._is_silent():
+            memset(out, 0, frames * sizeof(short))
+            self.phase = 0
+        else:
+            self.phase = self._render(out, modulator, frames, self.phase)
+        if self.reset:
+            self.reset = False
+            self.envelope._reset()
 
     @cython.cdivision(True)
     cpdef modulate(
         self,
         array.array out_buffer,
         array.array modulator,
-        double w_i,
+        uint32_t phase,
+        int32_t frames = -1,
     ):
         """Fill `out_buffer` with an enveloped and attenuated chunk of `self.wave`.
 
         The waveform is modulated by a `modulator` waveform which can be an output
-        of another Operator. By design velocity, volume, pitch, and the envelope
-        can change with sample-precision.
+        of another Operator. By design the envelope changes with sample-precision;
+        velocity, volume, and pitch are picked up once per buffer.
 
-        If you don't want modulation, use an identity `modulator` array (1-filled).
+        If you don't want modulation, pass None as `modulator`. Skipping the zero
+        modulator this way is cheaper than passing a silent array.
+
+        Renders `frames` samples, or by default the entire `modulator`, or the entire
+        `out_buffer` when there's no modulator. Returns the phase to pass to the next
+        call.
         """
+        cdef int mod_len = frames
+        if mod_len < 0:
+            mod_len = len(out_buffer) if modulator is None else len(modulator)
+        if mod_len > len(out_buffer) or (
+            modulator is not None and mod_len > len(modulator)
+        ):
+            raise ValueError(f"buffers too short for {mod_len} frames")
+
+        cdef short *raw_modulator = NULL
+        if modulator is not None:
+            raw_modulator = modulator.data.as_shorts
+
+        if self.envelope.is_silent():
+            memset(out_buffer.data.as_shorts, 0, mod_len * sizeof(short))
+            return 0
+
+        with nogil:
+            phase = self._render(
+                out_buffer.data.as_shorts, raw_modulator, mod_len, phase
+            )
+        return phase
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.cdivision(True)
+    cdef uint32_t _render(
+        self, short *out, short *modulator, int mod_len, uint32_t phase
+    ) noexcept nogil:
+        """The inner loop of `modulate()`, free to run without holding the GIL."""
         cdef int i
-        cdef int16_t mod
-        cdef double mod_scaled
-        cdef double triangle_factor
-        cdef int sr = self.sample_rate
-        cdef int16_t[:] w = self.wave
-        cdef int w_len = len(w)
-        envelope = self.envelope
-
-        if envelope.is_silent():
-            for i in range(len(modulator)):
-                out_buffer[i] = 0
-            return 0.0
+        cdef int block_len
+        cdef double env[ENVELOPE_BLOCK]
+        # Constant for the whole buffer: read once instead of once per sample.
+        cdef double amplitude = self.current_velocity * self.volume
+        cdef uint32_t step = <uint32_t><int64_t>(self.pitch * self.phase_factor + 0.5)
 
-        for i in range(len(modulator)):
-            mod = modulator.data.as_shorts[i]
-            mod_scaled = w_i + mod * w_len / INT16_MAXVALUE
-            triangle_factor = mod_scaled - floor(mod_scaled)
-            out_buffer.data.as_shorts[i] = saturate(
-                self.current_velocity
-                * self.volume
-                * envelope.advance()
-                * (
-                    (1.0 - triangle_factor) * w[modulo(<int>mod_scaled, w_len)]
-                    + triangle_factor * w[modulo(<int>mod_scaled + 1, w_len)]
-                )
+        for i in range(0, mod_len, ENVELOPE_BLOCK):
+            block_len = min(ENVELOPE_BLOCK, mod_len - i)
+            self.envelope._advance_block(env, block_len)
+            phase = render_op(
+                self.wave.data.as_shorts,
+                self.lobits,
+                &modulator[i] if modulator != NULL else NULL,
+                block_len,
+                phase,
+                step,
+                amplitude,
+                env,
+                &out[i],
             )
-            w_i += w_len * <double>self.pitch / sr
-        return w_i
+        return phase
 
     def is_silent(self):
-        return not self.reset and self.envelope.is_silent()
\ No newline at end of file
+        return not self.reset and self.envelope.is_silent()
+
+
+cpdef array.array render_algorithm(
+    int algorithm,
+    Operator op1,
+    Operator op2,
+    Operator op3,
+    Operator op4,
+    tuple buffers,
+    int32_t frames,
+):
+    """Render `frames` samples of the 4-operator FM `algorithm` and return them.
+
+    Operators are routed like the diagrams in `PhaseModulator`'s docstring show.
+    Any `algorithm` outside 0 - 10 renders as algorithm 11.
+    `buffers` holds five "h" scratch arrays of at least `frames` samples: one per
+    operator, and one for mixing carriers. The returned array is one of them, valid
+    until the next call.
+
+    All operators render and mix in one go without holding the GIL, instead of
+    calling back into Python between each of them.
+    """
+    if len(buffers) != 5:
+        raise ValueError(f"expected 5 scratch buffers, got {len(buffers)}")
+    cdef array.array buffer
+    for buffer in buffers:
+        if frames > len(buffer):
+            raise ValueError(f"buffers too short for {frames} frames")
+
+    cdef short *out1 = (<array.array>buffers[0]).data.as_shorts
+    cdef short *out2 = (<array.array>buffers[1]).data.as_shorts
+    cdef short *out3 = (<array.array>buffers[2]).data.as_shorts
+    cdef short *out4 = (<array.array>buffers[3]).data.as_shorts
+    cdef short *mix = (<array.array>buffers[4]).data.as_shorts
+    cdef const short *partials[4]
+    partials[0] = out1
+    partials[1] = out2
+    partials[2] = out3
+    partials[3] = out4
+    if not 0 <= algorithm <= 10:
+        algorithm = 11
+
+    with nogil:
+        op4._render_frames(out4, NULL, frames)
+        if algorithm == 0:
+            op3._render_frames(out3, out4, frames)
+            op2._render_frames(out2, out3, frames)
+            op1._render_frames(out1, out2, frames)
+        elif algorithm == 1:
+            op3._render_frames(out3, NULL, frames)
+            add_into(out3, out4, mix, frames)
+            op2._render_frames(out2, mix, frames)
+            op1._render_frames(out1, out2, frames)
+        elif algorithm == 2:
+            op3._render_frames(out3, NULL, frames)
+            op2._render_frames(out2, out3, frames)
+            op1._render_frames(out1, out2, frames)
+        elif algorithm == 3:
+            op3._render_frames(out3, out4, frames)
+            op2._render_frames(out2, out4, frames)
+            op1._render_frames(out1, out2, frames)
+        elif algorithm == 4:
+            op3._render_frames(out3, NULL, frames)
+            op2._render_frames(out2, NULL, frames)
+            sum_into(&partials[1], 3, mix, frames)
+            op1._render_frames(out1, mix, frames)
+        elif algorithm == 5:
+            op3._render_frames(out3, out4, frames)
+            op2._render_frames(out2, out3, frames)
+            op1._render_frames(out1, NULL, frames)
+            add_into(out1, out2, mix, frames)
+        elif algorithm == 6:
+            op3._render_frames(out3, out4, frames)
+            op2._render_frames(out2, out3, frames)
+            op1._render_frames(out1, out3, frames)
+            add_into(out1, out2, mix, frames)
+        elif algorithm == 7:
+            op3._render_frames(out3, NULL, frames)
+            op2._render_frames(out2, out4, frames)
+            op1._render_frames(out1, out3, frames)
+            add_into(out1, out2, mix, frames)
+        elif algorithm == 8:
+            op3._render_frames(out3, out4, frames)
+            op2._render_frames(out2, out4, frames)
+            op1._render_frames(out1, out4, frames)
+            sum_into(partials, 3, mix, frames)
+        elif algorithm == 9:
+            op3._render_frames(out3, out4, frames)
+            op2._render_frames(out2, out4, frames)
+            op1._render_frames(out1, NULL, frames)
+            sum_into(partials, 3, mix, frames)
+        elif algorithm == 10:
+            op3._render_frames(out3, out4, frames)
+            op2._render_frames(out2, NULL, frames)
+            op1._render_frames(out1, NULL, frames)
+            sum_into(partials, 3, mix, frames)
+        else:
+            op3._render_frames(out3, NULL, frames)
+            op2._render_frames(out2, NULL, frames)
+            op1._render_frames(out1, NULL, frames)
+            sum_into(partials, 4, mix, frames)
+
+    return buffers[0] if algorithm <= 4 else buffers[4]
+
+
+cpdef int32_t render_voices(
+    list voices, bytearray active, tuple gains, array.array out, int32_t frames
+):
+    """Render all active `voices` and mix them into `out`. Return how many there were.
+
+    `voices` are `PhaseModulator` objects; only those flagged in `active` at the same
+    index are rendered. `gains` holds their `(left, right)` pairs from `pan_gains`.
+    `out` is an "f" array receiving `frames` interleaved stereo frames, like in
+    `mix_stereo`.
+
+    Each voice renders with `render_algorithm` called from C, so the interpreter is
+    only needed to look up voice attributes.
+    """
+    cdef int32_t count = len(voices)
+    if len(active) < count or len(gains) < count:
+        raise ValueError("expected an active flag and gains for every voice")
+    if len(out) < 2 * frames:
+        raise ValueError(f"output buffer too short for {frames} frames")
+
+    cdef int32_t i
+    cdef int32_t mixed = 0
+    cdef array.array mono
+    cdef tuple gain_pair
+    cdef Pool mem = Pool()
+    cdef const short **raw_monos = <const short **>mem.alloc(count, sizeof(short *))
+    cdef float *left_gains = <float *>mem.alloc(count, sizeof(float))
+    cdef float *right_gains = <float *>mem.alloc(count, sizeof(float))
+    for i in range(count):
+        if not active[i]:
+            continue
+        voice = voices[i]
+        mono = render_algorithm(
+            voice.algorithm,
+            voice.op1,
+            voice.op2,
+            voice.op3,
+            voice.op4,
+            voice._buffers,
+            frames,
+        )
+        raw_monos[mixed] = mono.data.as_shorts
+        gain_pair = <tuple>gains[i]
+        left_gains[mixed] = gain_pair[0]
+        right_gains[mixed] = gain_pair[1]
+        mixed += 1
+
+    with nogil:
+        mix_into(raw_monos, left_gains, right_gains, mixed, out.data.as_floats, frames)
+    return mixed
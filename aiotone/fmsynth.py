@@ -6,15 +6,19 @@ from typing import *
 
 from array import array
 import asyncio
-from collections import defaultdict
 import configparser
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 import time
 
 import click
 import miniaudio
-import uvloop
+
+try:
+    from uvloop import run as run_event_loop
+except ImportError:  # uvloop doesn't support Windows
+    from asyncio import run as run_event_loop
 
 from . import profiling
 from .midi import (
@@ -44,7 +48,18 @@ from .midi import (
     silence,
 )
 from .notes import note_to_freq
-from .fm import calculate_panning, filter_array, saturate, Envelope, Operator
+from .realtime import promote_current_thread
+from .fm import (
+    calculate_auto_panning,
+    calculate_panning,
+    enable_flush_to_zero,
+    filter_array,
+    pan_gains,
+    render_algorithm,
+    render_voices,
+    Envelope,
+    Operator,
+)
 from .slew import SlewGenerator
 from .waves import sine_array, sine12_array, saw_array
 
@@ -52,12 +67,16 @@ from .waves import sine_array, sine12_array, saw_array
 # We want this to be symmetrical on the + and the - side.
 INT16_MAXVALUE = 32767
 MAX_BUFFER = 2400  # 5 ms at 48000 Hz
+WAVETABLE_SIZE = 2048  # samples per single-cycle wave; must be a power of two
 CURRENT_DIR = Path(__file__).parent
 DEBUG = False
+# How many of op1, op2, ... `PhaseModulator.is_silent()` checks, by algorithm.
+CARRIER_COUNTS = (1, 1, 2, 2, 3, 3, 3, 3, 3, 3, 3, 3)
 
 
 if TYPE_CHECKING:
     Audio = Generator[array[int], int, None]
+    StereoMix = Generator[array[float], int, None]
     FMAudio = Generator[array[int], array[int], None]
     EventDelta = float  # in seconds
     TimeStamp = float  # time.time()
@@ -74,31 +93,59 @@ if TYPE_CHECKING:
 init = next
 
 
+@lru_cache()
+def _wavetable(name: str, sample_count: int) -> array[int]:
+    """Memoized wavetable, shared by all operators of all voices.
+
+    Operators never write to their wave, so one copy per shape and size is enough.
+    It's also more likely to stay in the CPU cache while every voice renders.
+    """
+    if name == "sine":
+        return sine_array(sample_count)
+    if name == "sine12":
+        return sine12_array(sample_count)
+    if name == "filtered-saw":
+        return filter_array(saw_array(sample_count), sample_count // 8)
+    raise ValueError(f"unknown wavetable: {name}")
+
+
+def _zeros_h(count: int) -> array[int]:
+    """Return a signed 16-bit array of `count` zeros, filled with a single memset."""
+    return array("h", bytes(2 * count))
+
+
 def panning(mono: Audio, pan: float = 0.0) -> Audio:
+    """Pan `mono` statically.
+
+    Like all Audio generators here, yields the same buffer every time, sized to
+    exactly the requested number of frames.
+    """
     result = init(mono)
     want_frames = yield result
 
-    out_buffer = array("h", [0] * (2 * MAX_BUFFER))
+    out_buffer = _zeros_h(0)
     while True:
+        if len(out_buffer) != 2 * want_frames:
+            out_buffer = _zeros_h(2 * want_frames)
         mono_buffer = mono.send(want_frames)
         calculate_panning(pan, mono_buffer, out_buffer, want_frames)
-        want_frames = yield out_buffer[: 2 * want_frames]
+        want_frames = yield out_buffer
 
 
 def auto_pan(mono: Audio, panner: Audio) -> Audio:
+    """Pan `mono` sample by sample with the signal from `panner`."""
     result = init(mono)
     result = init(panner)
     want_frames = yield result
 
-    out_buffer = array("h", [0] * (2 * MAX_BUFFER))
+    out_buffer = _zeros_h(0)
     while True:
+        if len(out_buffer) != 2 * want_frames:
+            out_buffer = _zeros_h(2 * want_frames)
         mono_buffer = mono.send(want_frames)
         panning = panner.send(want_frames)
-        for i in range(want_frames):
-            pan = panning[i] / INT16_MAXVALUE
-            out_buffer[2 * i] = int((-pan + 1) / 2 * mono_buffer[i])
-            out_buffer[2 * i + 1] = int((pan + 1) / 2 * mono_buffer[i])
-        want_frames = yield out_buffer[: 2 * want_frames]
+        calculate_auto_panning(mono_buffer, panning, out_buffer, want_frames)
+        want_frames = yield out_buffer
 
 
 @dataclass
@@ -108,12 +155,22 @@ class Synthesizer:
     panning: List[float] = field(init=False)
     voices: List[PhaseModulator] = field(init=False)
     _voices_lru: List[int] = field(init=False)  # list of `voices` indexes
+    _active_voices: bytearray = field(init=False)  # 1 if `voices[i]` is sounding
     _sustain: int = field(init=False)
     _released_on_sustain: Set[float] = field(init=False)
     _pitch_bend_slew: SlewGenerator = field(init=False)
+    # Mixer state owned by the audio thread, see `render()`.
+    _mixed_voices: List[PhaseModulator] = field(init=False)
+    _voice_gains: Tuple[Tuple[float, float], ...] = field(init=False)
+    _silence_checks: Tuple[Callable[[], bool], ...] = field(init=False)
+    _out_buffer: array[float] = field(init=False)
+    _silence: array[float] = field(init=False)
 
     def __post_init__(self) -> None:
         self.reset_voices()
+        self._mixed_voices = []
+        self._out_buffer = array("f")
+        self._silence = array("f")
 
     async def __async_init__(self) -> None:
         self._pitch_bend_slew = SlewGenerator(
@@ -125,50 +182,81 @@ class Synthesizer:
         self.panning = [(2 * i / (polyphony - 1) - 1) for i in range(polyphony)]
         self.voices = [
             PhaseModulator(
-                wave1=filter_array(saw_array(2048), 256),
-                wave2=sine12_array(2048),
-                wave3=sine_array(2048),
-                wave4=sine_array(2048),
+                wave1=_wavetable("filtered-saw", WAVETABLE_SIZE),
+                wave2=_wavetable("sine12", WAVETABLE_SIZE),
+                wave3=_wavetable("sine", WAVETABLE_SIZE),
+                wave4=_wavetable("sine", WAVETABLE_SIZE),
                 sample_rate=self.sample_rate,
             )
             for i in range(polyphony)
         ]
         self._voices_lru = [i for i in range(polyphony)]
+        self._active_voices = bytearray(polyphony)
         self._sustain = 0
         self._released_on_sustain = set()
 
-    def stereo_out(self) -> Audio:
-        """A resettable stereo mixer."""
-
-        want_frames = 0
-        while True:
-            try:
-                yield from self._stereo_out(want_frames)
-            except EOFError as eof:
-                print(eof.args[0])
-                want_frames = eof.args[1]
-
-    def _stereo_out(self, want_frames: int = 0) -> Audio:
-        voices = [
-            panning(self.voices[i].mono_out(), self.panning[i])
-            for i in range(self.polyphony)
-        ]
-
-        mix_down = 1 / min(self.polyphony, 8)
-        stereo = [init(v) for v in voices]
-        if want_frames == 0:
-            want_frames = yield stereo[0]
-        id_voices = id(self.voices)
+    def stereo_out(self) -> StereoMix:
+        """A stereo mixer producing float32 samples, a generator wrapper around
+        `render()` for miniaudio.
 
-        out_buffer = array("h", [0] * (2 * MAX_BUFFER))
+        To avoid allocating on the audio thread, the same array is yielded over and
+        over again: consume it before sending the generator the next frame count.
+        """
+        want_frames = yield self._silence
+        # From here on the generator runs on the audio thread.
+        enable_flush_to_zero()
         with profiling.maybe(DEBUG):
             while True:
-                if id(self.voices) != id_voices:
-                    raise EOFError("Voices have been reset", want_frames)
-                stereo = [v.send(want_frames) for v in voices]
-                for i in range(0, 2 * want_frames):
-                    out_buffer[i] = int(sum([mix_down * s[i] for s in stereo]))
-                want_frames = yield out_buffer[: 2 * want_frames]
+                want_frames = yield self.render(want_frames)
+
+    def render(self, frames: int) -> array[float]:
+        """Mix `frames` interleaved stereo frames of all sounding voices.
+
+        Returns a float32 buffer of exactly `2 * frames` samples which is only valid
+        until the next call. Voices replaced by `reset_voices()` are picked up on
+        the next call.
+        """
+        if self.voices is not self._mixed_voices:
+            self._prepare_mixer()
+        out_buffer = self._out_buffer
+        if len(out_buffer) != 2 * frames:
+            # Audio devices ask for the same number of frames every time
+            # so this practically only happens for the first buffer.
+            out_buffer = self._out_buffer = array("f", bytes(4 * 2 * frames))
+            self._silence = array("f", bytes(4 * 2 * frames))
+        active = self._active_voices
+        if 1 not in active:
+            return self._silence
+
+        render_voices(
+            self._mixed_voices, active, self._voice_gains, out_buffer, frames
+        )
+        self._retire_silent_voices()
+        return out_buffer
+
+    def _prepare_mixer(self) -> None:
+        """Cache what `render()` needs from the current voices."""
+        voices = self.voices
+        # Pans don't change between buffers, and neither does the master gain.
+        gain = 1 / min(len(voices), 8)
+        self._voice_gains = tuple(pan_gains(pan, gain) for pan in self.panning)
+        # Bound once so retiring voices doesn't look the method up on every buffer.
+        self._silence_checks = tuple(v.is_silent for v in voices)
+        self._mixed_voices = voices
+
+    def _retire_silent_voices(self) -> None:
+        """Stop rendering voices that went silent since the last buffer.
+
+        Runs on the audio thread while `note_on` may run concurrently on the event
+        loop thread. Checking again after clearing the flag ensures a voice that got
+        a new note in between won't stay muted.
+        """
+        active = self._active_voices
+        for i, is_silent in enumerate(self._silence_checks):
+            if active[i] and is_silent():
+                active[i] = 0
+                if not is_silent():
+                    active[i] = 1
 
     # MIDI support
 
@@ -188,34 +276,44 @@ class Synthesizer:
             return
 
         volume = velocity / 127
-        voices = self.voices
         lru = self._voices_lru
-        v: PhaseModulator
-        first_released = None
+        active = self._active_voices
+        # Fast path: voices retired by the audio thread are known to be silent
+        # without asking their operators.
         for vli, vi in enumerate(lru):
-            v = voices[vi]
-            if v.is_silent():
-                lru.append(lru.pop(vli))
+            if not active[vi]:
                 break
-            elif first_released is None and v.is_released():
-                first_released = vli
         else:
-            if first_released is not None:
-                # The first released voice is the most likely to be the least disrupted
-                # by cutting it short.
-                vli = first_released
-            else:
-                # If no voices were unused nor released, just take the least recently
-                # used one.
-                vli = 0
-            vi = lru.pop(vli)
-            v = voices[vi]
-            lru.append(vi)
-        v.note_on(pitch, volume)
+            vli = self._pick_busy_voice()
+        vi = lru.pop(vli)
+        lru.append(vi)
+        self.voices[vi].note_on(pitch, volume)
+        active[vi] = 1
         if self._sustain > 32:
             self._released_on_sustain.discard(pitch)
             return
 
+    def _pick_busy_voice(self) -> int:
+        """Return the `_voices_lru` index of the voice to reuse when all are active."""
+        voices = self.voices
+        first_released = None
+        for vli, vi in enumerate(self._voices_lru):
+            v = voices[vi]
+            if v.is_silent():
+                # Went silent since the audio thread last checked.
+                return vli
+            elif first_released is None and v.is_released():
+                first_released = vli
+
+        if first_released is not None:
+            # The first released voice is the most likely to be the least disrupted
+            # by cutting it short.
+            return first_released
+
+        # If no voices were unused nor released, just take the least recently used
+        # one.
+        return 0
+
     async def note_off(self, note: int, velocity: int) -> None:
         try:
             pitch = note_to_freq[note]
@@ -311,8 +409,12 @@ class PhaseModulator:
     op3: Operator = field(init=False)
     op4: Operator = field(init=False)
     last_pitch_played: float = field(init=False)
+    # Scratch buffers: one per operator and one for mixing. Along with `algorithm`
+    # and the operators, `fm.render_voices()` reads these directly.
+    _buffers: Tuple[array[int], ...] = field(init=False)
 
     def __post_init__(self) -> None:
+        self._buffers = tuple(_zeros_h(MAX_BUFFER) for _ in range(5))
         self.reset_operators()
 
     def reset_operators(self) -> None:
@@ -363,14 +465,15 @@ class PhaseModulator:
         self.last_pitch_played = 0.0
 
     def is_silent(self) -> bool:
-        algo = self.algorithm
-        if algo == 0 or algo == 1:
-            return self.op1.is_silent()
-
-        if algo == 2 or algo == 3:
-            return self.op1.is_silent() and self.op2.is_silent()
-
-        return self.op1.is_silent() and self.op2.is_silent() and self.op3.is_silent()
+        algorithm = self.algorithm
+        if not 0 <= algorithm <= 10:
+            algorithm = 11  # like in `fm.render_algorithm()`
+        count = CARRIER_COUNTS[algorithm]
+        return (
+            self.op1.is_silent()
+            and (count < 2 or self.op2.is_silent())
+            and (count < 3 or self.op3.is_silent())
+        )
 
     def note_on(self, pitch: float, volume: float) -> None:
         self.last_pitch_played = pitch
@@ -396,105 +499,21 @@ class PhaseModulator:
         self.op3.pitch_bend(semitones)
         self.op4.pitch_bend(semitones)
 
-    def mono_out(self) -> Audio:
-        out_buffer = array("h", [0] * MAX_BUFFER)
-        zero_buffer = array("h", [0] * MAX_BUFFER)
-
-        op1 = self.op1.mono_out()
-        op2 = self.op2.mono_out()
-        op3 = self.op3.mono_out()
-        op4 = self.op4.mono_out()
-        init(op1)
-        init(op2)
-        init(op3)
-        init(op4)
-        want_frames = yield out_buffer
-
-        while True:
-            algo = self.algorithm
-            out4 = op4.send(zero_buffer[:want_frames])
-            if algo == 0:
-                out3 = op3.send(out4)
-                out2 = op2.send(out3)
-                out1 = op1.send(out2)
-                want_frames = yield out1
-            elif algo == 1:
-                out3 = op3.send(zero_buffer[:want_frames])
-                for i in range(want_frames):
-                    out_buffer[i] = saturate(out3[i] + out4[i])
-                out2 = op2.send(out_buffer[:want_frames])
-                out1 = op1.send(out2)
-                want_frames = yield out1
-            elif algo == 2:
-                out3 = op3.send(zero_buffer[:want_frames])
-                out2 = op2.send(out3)
-                for i in range(want_frames):
-                    out_buffer[i] = saturate(out2[i] + out4[i])
-                out1 = op1.send(out2)
-                want_frames = yield out1
-            elif algo == 3:
-                out3 = op3.send(out4)
-                out2 = op2.send(out4)
-                for i in range(want_frames):
-                    out_buffer[i] = saturate(out2[i] + out3[i])
-                out1 = op1.send(out2)
-                want_frames = yield out1
-            elif algo == 4:
-                out3 = op3.send(zero_buffer[:want_frames])
-                out2 = op2.send(zero_buffer[:want_frames])
-                for i in range(want_frames):
-                    out_buffer[i] = saturate(out2[i] + out3[i] + out4[i])
-                out1 = op1.send(out_buffer[:want_frames])
-                want_frames = yield out1
-            elif algo == 5:
-                out3 = op3.send(out4)
-                out2 = op2.send(out3)
-                out1 = op1.send(zero_buffer[:want_frames])
-                for i in range(want_frames):
-                    out_buffer[i] = saturate(out1[i] + out2[i])
-                want_frames = yield out_buffer[:want_frames]
-            elif algo == 6:
-                out3 = op3.send(out4)
-                out2 = op2.send(out3)
-                out1 = op1.send(out3)
-                for i in range(want_frames):
-                    out_buffer[i] = saturate(out1[i] + out2[i])
-                want_frames = yield out_buffer[:want_frames]
-            elif algo == 7:
-                out3 = op3.send(zero_buffer[:want_frames])
-                out2 = op2.send(out4)
-                out1 = op1.send(out3)
-                for i in range(want_frames):
-                    out_buffer[i] = saturate(out1[i] + out2[i])
-                want_frames = yield out_buffer[:want_frames]
-            elif algo == 8:
-                out3 = op3.send(out4)
-                out2 = op2.send(out4)
-                out1 = op1.send(out4)
-                for i in range(want_frames):
-                    out_buffer[i] = saturate(out1[i] + out2[i] + out3[i])
-                want_frames = yield out_buffer[:want_frames]
-            elif algo == 9:
-                out3 = op3.send(out4)
-                out2 = op2.send(out4)
-                out1 = op1.send(zero_buffer[:want_frames])
-                for i in range(want_frames):
-                    out_buffer[i] = saturate(out1[i] + out2[i] + out3[i])
-                want_frames = yield out_buffer[:want_frames]
-            elif algo == 10:
-                out3 = op3.send(out4)
-                out2 = op2.send(zero_buffer[:want_frames])
-                out1 = op1.send(zero_buffer[:want_frames])
-                for i in range(want_frames):
-                    out_buffer[i] = saturate(out1[i] + out2[i] + out3[i])
-                want_frames = yield out_buffer[:want_frames]
-            else:
-                out3 = op3.send(zero_buffer[:want_frames])
-                out2 = op2.send(zero_buffer[:want_frames])
-                out1 = op1.send(zero_buffer[:want_frames])
-                for i in range(want_frames):
-                    out_buffer[i] = saturate(out1[i] + out2[i] + out3[i] + out4[i])
-                want_frames = yield out_buffer[:want_frames]
+    def render(self, frames: int) -> array[int]:
+        """Render `frames` samples with the current algorithm.
+
+        Returns a scratch buffer of at least `frames` samples which is only valid
+        until the next call.
+        """
+        return render_algorithm(
+            self.algorithm,
+            self.op1,
+            self.op2,
+            self.op3,
+            self.op4,
+            self._buffers,
+            frames,
+        )
 
     def is_released(self) -> bool:
         return self.last_pitch_played == 0.0
@@ -510,9 +529,37 @@ async def async_main(synth: Synthesizer, cfg: Mapping[str, str]) -> None:
     except ValueError as port:
         raise click.UsageError(f"midi-in port {port} not connected")
 
+    callback_promoted = False
+    last_clock = 0.0
+    last_cc = bytearray(128)  # last value of each CC number
+    # 14-bit controllers: MSB -> LSB and LSB -> MSB
+    cc_lsb = {MOD_WHEEL: MOD_WHEEL_LSB, EXPRESSION_PEDAL: EXPRESSION_PEDAL_LSB}
+    cc_msb = {MOD_WHEEL_LSB: MOD_WHEEL, EXPRESSION_PEDAL_LSB: EXPRESSION_PEDAL}
+
     def midi_callback(msg, data=None):
+        nonlocal callback_promoted, last_clock
         sent_time = time.time()
+        if not callback_promoted:
+            # This runs on rtmidi's thread, which only exists once messages flow.
+            callback_promoted = True
+            promote_current_thread()
         midi_message, event_delta = msg
+        t = midi_message[0]
+        if t == CLOCK:
+            if sent_time - last_clock < 0.001:
+                return  # duplicate tick, nothing to gain from enqueueing it
+
+            last_clock = sent_time
+        elif t & STRIP_CHANNEL == CONTROL_CHANGE:
+            # Merge MSB/LSB pairs so the consumer gets a single 14-bit value
+            # reported under the MSB controller number.
+            cc, value = midi_message[1], midi_message[2]
+            last_cc[cc] = value
+            if cc in cc_lsb:
+                midi_message = [t, cc, 128 * value + last_cc[cc_lsb[cc]]]
+            elif cc in cc_msb:
+                msb = cc_msb[cc]
+                midi_message = [t, msb, 128 * last_cc[msb] + value]
         try:
             loop.call_soon_threadsafe(
                 queue.put_nowait, (midi_message, event_delta, sent_time)
@@ -538,9 +585,10 @@ async def midi_consumer(queue: asyncio.Queue[MidiMessage], synth: Synthesizer) -
         | notes
         | {CONTROL_CHANGE, PROGRAM_CHANGE, CHAN_AFTERTOUCH, POLY_AFTERTOUCH}
     )
-    last: Dict[int, int] = defaultdict(int)  # last CC value
-    while True:
-        msg, delta, sent_time = await queue.get()
+
+    async def dispatch(
+        msg: MidiPacket, delta: EventDelta, sent_time: TimeStamp
+    ) -> None:
         latency = time.time() - sent_time
         t = msg[0]
         if t == CLOCK:
@@ -592,15 +640,11 @@ async def midi_consumer(queue: asyncio.Queue[MidiMessage], synth: Synthesizer) -
             elif t == NOTE_OFF:
                 await synth.note_off(msg[1], msg[2])
             elif t == CONTROL_CHANGE:
-                last[msg[1]] = msg[2]
+                # 14-bit controllers arrive already merged by `midi_callback`.
                 if msg[1] == MOD_WHEEL:
-                    await synth.mod_wheel(128 * msg[2] + last[MOD_WHEEL_LSB])
-                elif msg[1] == MOD_WHEEL_LSB:
-                    await synth.mod_wheel(128 * last[MOD_WHEEL] + msg[2])
+                    await synth.mod_wheel(msg[2])
                 elif msg[1] == EXPRESSION_PEDAL:
-                    await synth.expression(128 * msg[2] + last[EXPRESSION_PEDAL_LSB])
-                elif msg[1] == EXPRESSION_PEDAL_LSB:
-                    await synth.expression(128 * last[EXPRESSION_PEDAL] + msg[2])
+                    await synth.expression(msg[2])
                 elif msg[1] == SUSTAIN_PEDAL:
                     await synth.sustain(msg[2])
                 elif msg[1] == ALL_NOTES_OFF:
@@ -613,6 +657,12 @@ async def midi_consumer(queue: asyncio.Queue[MidiMessage], synth: Synthesizer) -
                 if st not in handled_types:
                     click.secho(f"warning: unhandled event {msg}", err=True)
 
+    while True:
+        await dispatch(*await queue.get())
+        # Handle a burst of messages in one go before yielding back to the loop.
+        while not queue.empty():
+            await dispatch(*queue.get_nowait())
+
 
 @click.command()
 @click.option(
@@ -701,7 +751,7 @@ def main(config: str, make_config: bool) -> None:
         device_id=play_id,
         nchannels=2,
         sample_rate=sample_rate,
-        output_format=miniaudio.SampleFormat.SIGNED16,
+        output_format=miniaudio.SampleFormat.FLOAT32,
         buffersize_msec=buffer_msec,
     ) as dev:
         synth = Synthesizer(sample_rate=sample_rate, polyphony=polyphony)
@@ -709,11 +759,10 @@ def main(config: str, make_config: bool) -> None:
         init(stream)
         dev.start(stream)
         try:
-            asyncio.run(async_main(synth, cfg["midi-in"]))
+            run_event_loop(async_main(synth, cfg["midi-in"]))
         except KeyboardInterrupt:
             pass
 
 
 if __name__ == "__main__":
-    uvloop.install()
     main()
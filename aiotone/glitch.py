@@ -14,19 +14,26 @@ from time import monotonic
 
 import click
 import miniaudio
-import uvloop
+
+try:
+    from uvloop import run as run_event_loop
+except ImportError:  # uvloop doesn't support Windows
+    from asyncio import run as run_event_loop
 
 from . import profiling
+from .array_perf import route_audio
+from .realtime import promote_current_thread
 
 
 MAX_BUFFER = 2400  # 5 ms at 48000 Hz
+LATENCY_RINGBUF_LEN = 32  # a power of two so the index wraps with a bitmask
 CURRENT_DIR = Path(__file__).parent
 DEBUG = True
 PROFILE_AUDIO_THREAD = False
 
 
 if TYPE_CHECKING:
-    Audio = Generator[array[float], array[float], None]
+    Audio = Generator[memoryview, bytes, None]
     TimeStamp = float  # time.time()
 
 
@@ -46,36 +53,44 @@ class Glitch:
     in_channels: tuple[int, int]
     max_latency: float
     profiler: profiling.Profile | None = None
-    _want_frames: int = field(init=False)
-    _data: list[float] = field(init=False)
+    _data: array[float] = field(init=False)  # per-channel sum of the last buffer
     _underruns: int = field(init=False)
     _latency_ringbuf: array[float] = field(init=False)
-    _latency_ts: float = field(init=False)
-    _latency_index: int = field(init=False)
-    _processing_ts: float = field(init=False)  # always up to date
+    _latency_sum: float = field(init=False)  # of all `_latency_ringbuf` entries
     _proc_time: float = field(init=False)  # from the time of the lsat underrun
     _proc_stats: str = field(init=False)
 
     def __post_init__(self) -> None:
-        self._want_frames = 0
-        self._data = [0] * self.num_channels
+        self._data = array("f", [0.0] * self.num_channels)
         self._underruns = 0
-        self._latency_index = -1
-        self._latency_ringbuf = array("f", [0.0] * 20)
-        self._latency_ts = monotonic()
-        self._processing_ts = monotonic()
-        self._processing_ts = 0.0
+        self._latency_ringbuf = array("f", [0.0] * LATENCY_RINGBUF_LEN)
+        self._latency_sum = 0.0
         self._proc_time = 0.0
         self._proc_stats = ""
 
     def audio_stream(self) -> Audio:
+        num_channels = self.num_channels
         buffer_format = "f"
-        buffer_size = self.num_channels * MAX_BUFFER
+        buffer_size = num_channels * MAX_BUFFER
         out_buffer = array(buffer_format, [0.0] * buffer_size)
-        in_buffer = out_buffer
-        channel_pairs = list(zip(self.out_channels, self.in_channels))
-        channels = list(range(self.num_channels))
-        lat_ringbuf_len = len(self._latency_ringbuf)
+        # Yielding slices of a memoryview hands miniaudio the samples without
+        # copying them out of `out_buffer` first. The device asks for the same
+        # number of frames every time, so the slice is kept until that changes.
+        out_view = memoryview(out_buffer)
+        out_slice = out_view[:0]
+        in_samples = array(buffer_format)
+        in_l, in_r = self.in_channels
+        out_l, out_r = self.out_channels
+        # State only this loop touches lives in locals rather than attributes,
+        # which are slower to read and write on every period. `_latency_sum`,
+        # `_underruns`, and `_proc_time` are read elsewhere so they're stored.
+        latency_ringbuf = self._latency_ringbuf
+        latency_sum = self._latency_sum
+        lat_ringbuf_mask = len(latency_ringbuf) - 1
+        latency_index = -1
+        latency_ts = monotonic()
+        processing_ts = 0.0
+        promoted = False
 
         # This generator will get updates every `max_latency` seconds. In the ideal
         # scenario each iteration would take 0.0 seconds to process so the minimal
@@ -88,32 +103,35 @@ class Glitch:
         # 2 * max_latency here.
         max_latency = 2 * self.max_latency
 
-        def copy_buffer():
-            for offset in range(0, self._want_frames, self.num_channels):
-                for ch in channels:
-                    out_buffer[offset + ch] = 0
-                    self._data[ch] += in_buffer[offset + ch]
-                for out_ch, in_ch in channel_pairs:
-                    out_buffer[offset + out_ch] = in_buffer[offset + in_ch]
-
         while True:
             now = monotonic()
-            lat = now - self._latency_ts
-            self._latency_index = (self._latency_index + 1) % lat_ringbuf_len
-            self._latency_ringbuf[self._latency_index] = lat
+            lat = now - latency_ts
+            latency_index = (latency_index + 1) & lat_ringbuf_mask
+            evicted = latency_ringbuf[latency_index]
+            latency_ringbuf[latency_index] = lat
+            # Add what got stored, as float32, so the sum doesn't drift over time.
+            latency_sum += latency_ringbuf[latency_index] - evicted
+            self._latency_sum = latency_sum
             if lat > max_latency:
                 self._underruns += 1
-                self._proc_time = self._processing_ts
-            self._data = [0] * self.num_channels
-            copy_buffer()
-            input_bytes = yield out_buffer[: self._want_frames]
-            in_buffer = array(buffer_format, input_bytes)
-            self._want_frames = len(in_buffer)
-            self._processing_ts = monotonic() - now
-            self._latency_ts = now
+                self._proc_time = processing_ts
+            route_audio(in_samples, in_l, in_r, out_buffer, out_l, out_r, self._data)
+            input_bytes = yield out_slice
+            if not promoted:
+                # `init()` ran the first iteration on the main thread. From here on
+                # the generator runs on miniaudio's audio thread.
+                promoted = True
+                promote_current_thread()
+            # Read the input in place. It's only routed above before the next
+            # yield, while miniaudio still holds the memory.
+            in_samples = memoryview(input_bytes).cast(buffer_format)
+            if len(out_slice) != len(in_samples):
+                out_slice = out_view[: len(in_samples)]
+            processing_ts = monotonic() - now
+            latency_ts = now
 
     def latency_avg(self) -> float:
-        return sum(self._latency_ringbuf) / len(self._latency_ringbuf)
+        return self._latency_sum / len(self._latency_ringbuf)
 
     def proc_time(self) -> float:
         return self._proc_time
@@ -144,23 +162,18 @@ async def async_main(glitch: Glitch):
     last_underruns = 0
     while True:
         await asyncio.sleep(0.1)
-        channels = ""
-        for elem in glitch._data:
-            channels += f"{elem:+06.2f} "[-7:]
-
-        new_underruns = glitch._underruns > last_underruns
-        if new_underruns:
+        if glitch._underruns > last_underruns:
             last_underruns = glitch._underruns
+            channels = "".join(f"{elem:+06.2f} "[-7:] for elem in glitch._data)
             print(
                 f"{channels} {glitch._underruns} {glitch.proc_time():.6f}"
                 f" {glitch.latency_avg():.6f} {pad}",
                 end="\r",
                 flush=True,
             )
-            if new_underruns:
-                print()
-                if DEBUG:
-                    print(glitch._proc_stats)
+            print()
+            if DEBUG:
+                print(glitch._proc_stats)
 
 
 def channel_tuple_from_string(channels: str) -> tuple[int, int]:
@@ -267,11 +280,11 @@ def main(config: str, make_config: bool) -> None:
                 gc.collect(0)
                 gc.collect(1)
                 gc.collect(2)
-                asyncio.run(async_main(glitch))
+                gc.freeze()  # decrease the pool of garbage-collected memory
+                run_event_loop(async_main(glitch))
             except KeyboardInterrupt:
                 pass
 
 
 if __name__ == "__main__":
-    uvloop.install()
     main()
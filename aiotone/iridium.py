@@ -3,9 +3,11 @@
 from __future__ import annotations
 
 import asyncio
-from collections.abc import Callable, Coroutine
+from collections import OrderedDict, deque
+from collections.abc import Callable, Iterable
 import configparser
 from enum import Enum
+from functools import partial
 import os
 from pathlib import Path
 import sys
@@ -15,7 +17,11 @@ from typing import List, Tuple
 from attrs import define, field, Factory
 import click
 import numpy as np
-import uvloop
+
+try:
+    from uvloop import run as run_event_loop
+except ImportError:  # uvloop doesn't support Windows
+    from asyncio import run as run_event_loop
 
 from . import monome
 from . import profiling
@@ -25,6 +31,7 @@ from .midi import (
     NOTE_ON,
     CLOCK,
     START,
+    CONTINUE,
     STOP,
     SONG_POSITION,
     CONTROL_CHANGE,
@@ -47,16 +54,17 @@ from .notes import C, Cs, D, Ds, E, F, Fs, G, Gs, A, As, B, Db, Eb, Gb, Ab, Bb
 
 # types
 EventDelta = float  # in seconds
-TimeStamp = float  # time.time()
+TimeStamp = float  # time.perf_counter()
 MidiPacket = List[int]
 MidiMessage = Tuple[MidiPacket, EventDelta, TimeStamp]
 MidiNote = int
 Velocity = int
-Coro = Coroutine[None, None, None]
 
 
 DEBUG = False
+TRACE = False  # print every MIDI message handled, with its latency
 CURRENT_DIR = Path(__file__).parent
+LED_FRAME_INTERVAL = 0.03  # seconds between grid redraws
 CONFIGPARSER_FALSE = {
     k
     for k, v in configparser.ConfigParser.BOOLEAN_STATES.items()  # type: ignore
@@ -64,7 +72,14 @@ CONFIGPARSER_FALSE = {
 }
 # CCs used by Iridium for sending and receiving modulation
 MODULATION_CC = set(range(16, 32))
+# CCs which only carry the current position of a control, unlike switches
+CONTINUOUS_CC = MODULATION_CC | {MOD_WHEEL, FOOT_PEDAL, EXPRESSION_PEDAL}
 WHITE_KEYS = {0, 2, 4, 5, 7, 9, 11}
+# Grid LED levels for the keyboard drawn on the first 12 columns, indexed [x][y].
+# Each row is an octave, the lowest one at the bottom.
+KEYBOARD_LEDS = np.zeros((16, 8), dtype=np.uint8)
+KEYBOARD_LEDS[:12] = 1
+KEYBOARD_LEDS[sorted(WHITE_KEYS)] = 2
 
 
 class NoteMode(Enum):
@@ -85,8 +100,10 @@ class MIDIMonitorGridApp(monome.GridApp):
 
     def __post_init__(self) -> None:
         super().__init__()
-        self._buffer = np.zeros(8, dtype=(">i", 8))
-        self._leds = np.zeros(16, dtype=(">i", 8))
+        # Levels are 0 - 15 so bytes will do. Only the tile sent to the grid must be
+        # made of big-endian int32s, which is what OSC packs them as.
+        self._buffer = np.zeros((8, 8), dtype=">i4")
+        self._leds = np.zeros((16, 8), dtype=np.uint8)
         self._input_queue = asyncio.Queue(maxsize=128)
 
     def __attrs_post_init__(self) -> None:
@@ -106,6 +123,7 @@ class MIDIMonitorGridApp(monome.GridApp):
         if self.height > 8:
             print("Constraining to first 8 rows")
             self.height = 8
+        self.performance.notes_changed.set()
 
     def on_grid_disconnect(self) -> None:
         print("Grid disconnected")
@@ -125,22 +143,37 @@ class MIDIMonitorGridApp(monome.GridApp):
         while True:
             note, velocity = await q.get()
             if velocity:
-                await p.note_on(note, velocity)
+                p.note_on(note, velocity)
             else:
-                await p.note_off(note, velocity)
+                p.note_off(note, velocity)
 
     async def handle_leds(self) -> None:
+        loop = asyncio.get_running_loop()
+        notes_changed = self.performance.notes_changed
         fps = 0
-        last_sec = time.monotonic()
+        last_sec = next_frame = loop.time()
         while True:
+            # Nothing to redraw until the notes change, so an idle grid costs nothing.
+            await notes_changed.wait()
+            now = loop.time()
+            if now < next_frame:
+                # Keep to the frame rate. Whatever else changes until the next frame
+                # is due gets drawn with it. Sleeping until a deadline rather than
+                # a fixed amount keeps the time `draw()` takes out of the rate.
+                await asyncio.sleep(next_frame - now)
+            else:
+                # Coming back from idle, or after a stall, time frames from now
+                # instead of drawing the missed ones in a burst.
+                next_frame = now
+            notes_changed.clear()
             fps += 1
             self.draw()
-            now = time.monotonic()
+            next_frame += LED_FRAME_INTERVAL
+            now = loop.time()
             if now - last_sec >= 1:
                 self.render_fps = fps / (now - last_sec)
                 fps = 0
                 last_sec = now
-            await asyncio.sleep(0.03)
 
     async def run(self) -> None:
         try:
@@ -156,29 +189,16 @@ class MIDIMonitorGridApp(monome.GridApp):
             return
 
         leds = self._leds
-        leds[:] = 0
-        notes = {}
-        notes_down = self.performance.notes_down
-        notes_sustained = self.performance.notes_sustained
-        for note in notes_sustained:
-            notes[note] = 8
-        for note in notes_down:
-            notes[note] = 15
-        for y in range(0, 8):
-            for x in range(0, 12):
-                cur_note = 12 * (9 - y) + x
-                if n := notes.get(cur_note):
-                    leds[x][y] = n
-                else:
-                    leds[x][y] = 2 if x in WHITE_KEYS else 1
+        leds[:] = KEYBOARD_LEDS
+        # Notes held down are drawn over sustained ones.
+        light_notes(leds, self.performance.notes_sustained, 8)
+        light_notes(leds, self.performance.notes_down, 15)
 
         b = self._buffer
         for x_offset in range(0, self.width, 8):
             for y_offset in range(0, self.height, 8):
-                b[:] = 0
-                for x in range(8):
-                    for y in range(8):
-                        b[y][x] = leds[x_offset + x][y_offset + y]
+                # Grid maps are row-major, `leds` is indexed [x][y].
+                b[:] = leds[x_offset : x_offset + 8, y_offset : y_offset + 8].T
                 self.grid.led_level_map_raw(x_offset, y_offset, b)
 
     def disconnect(self) -> None:
@@ -189,6 +209,54 @@ class MIDIMonitorGridApp(monome.GridApp):
         self.grid.disconnect()
 
 
+def light_notes(leds: np.ndarray, notes: Iterable[int], level: int) -> None:
+    """Set `notes` on the keyboard in `leds` to `level`, skipping off-grid octaves."""
+    note_array = np.fromiter(notes, dtype=np.intp)
+    x = note_array % 12
+    y = 9 - note_array // 12
+    visible = (y >= 0) & (y < 8)
+    leds[x[visible], y[visible]] = level
+
+
+@define
+class MidiQueue:
+    """Hands MIDI messages over from the rtmidi callback thread to the event loop.
+
+    Appending to a deque is atomic so the callback thread needs no lock. The event
+    loop is only woken up once for all messages that arrived since it last looked,
+    instead of once per message as with `call_soon_threadsafe(queue.put_nowait)`.
+
+    The deque is unbounded on purpose: with a bound, a burst of controller messages
+    would push out older ones, note offs included. Bursts are cheap to drain since
+    the consumer skips controller values that are immediately superseded.
+    """
+
+    loop: asyncio.AbstractEventLoop
+    _messages: deque[MidiMessage] = Factory(deque)
+    _ready: asyncio.Event = Factory(asyncio.Event)
+    _wakeup_pending: bool = False
+
+    def put_threadsafe(self, message: MidiMessage) -> None:
+        self._messages.append(message)
+        if not self._wakeup_pending:
+            self._wakeup_pending = True
+            self.loop.call_soon_threadsafe(self._ready.set)
+
+    async def get_batch(self) -> list[MidiMessage]:
+        """Wait for messages and return all of them, oldest first.
+
+        Can return an empty list when the messages behind a wakeup were already
+        taken by the previous batch.
+        """
+        await self._ready.wait()
+        # Reset before draining: a message appended from now on schedules another
+        # wakeup, so it can't get stuck until some unrelated one comes along.
+        self._ready.clear()
+        self._wakeup_pending = False
+        messages = self._messages
+        return [messages.popleft() for _ in range(len(messages))]
+
+
 @define
 class Performance:
     note_output: MidiOut
@@ -200,18 +268,42 @@ class Performance:
 
     # Current state of the performance
     is_sustain: bool = False
-    notes_down: list[int] = Factory(list)
-    notes_sustained: list[int] = Factory(list)
+    # Ordered from the oldest note so that voice stealing drops it first. Only keys
+    # are used; a dict makes finding and removing a given note O(1).
+    notes_down: OrderedDict[int, None] = Factory(OrderedDict)
+    notes_sustained: OrderedDict[int, None] = Factory(OrderedDict)
     last_expr: int = -1
     last_mod: int = -1
     render_fps: float = 0.0
 
     # Internal state
-    sustain: Callable[[int], Coro] = field(init=False)
-    note_on: Callable[[int, int], Coro] = field(init=False)
-    note_off: Callable[[int, int], Coro] = field(init=False)
+    # Set whenever `notes_down` or `notes_sustained` change, for the grid to redraw.
+    notes_changed: asyncio.Event = field(init=False, factory=asyncio.Event)
+    sustain: Callable[[int], None] = field(init=False)
+    note_on: Callable[[int, int], None] = field(init=False)
+    note_off: Callable[[int, int], None] = field(init=False)
+    # Messages are built once per kind, with the status byte for the output channel
+    # already in place. rtmidi copies the bytes before `send_message()` returns, so
+    # only the data bytes need updating before the list is sent again.
+    _note_on_message: list[int] = field(init=False)
+    _note_off_message: list[int] = field(init=False)
+    _at_message: list[int] = field(init=False)
+    _cc_message: list[int] = field(init=False)
+    # Bound once instead of looked up on `note_output` for every message.
+    _send: Callable[[list[int]], None] = field(init=False)
+    # System real-time messages passed on as they are, from the MIDI callback.
+    realtime_messages: dict[int, list[int]] = field(init=False)
 
     def __post_init__(self) -> None:
+        self._send = self.note_output.send_message
+        self.realtime_messages = {CLOCK: [CLOCK]}
+        if self.start_stop:
+            for status in (START, CONTINUE, STOP):
+                self.realtime_messages[status] = [status]
+        self._note_on_message = [NOTE_ON | self.out_channel, 0, 0]
+        self._note_off_message = [NOTE_OFF | self.out_channel, 0, 0]
+        self._at_message = [POLY_AFTERTOUCH | self.out_channel, 0, 0]
+        self._cc_message = [CONTROL_CHANGE | self.out_channel, 0, 0]
         if self.catch_damper:
             self.sustain = self.own_sustain
             self.note_on = self.own_note_on
@@ -224,102 +316,118 @@ class Performance:
     def __attrs_post_init__(self) -> None:
         self.__post_init__()
 
-    async def clock(self) -> None:
-        self.note_output.send_message([CLOCK])
-
-    def clock_eager(self) -> None:
-        self.note_output.send_message([CLOCK])
-
-    async def start(self) -> None:
-        if self.start_stop:
-            self.note_output.send_message([START])
-
-    async def stop(self) -> None:
-        silence(port=self.note_output, stop=self.start_stop)
+    def stop(self) -> None:
+        # Notes only ever go out on `out_channel`, so the other 15 channels don't
+        # need their own sustain and all-notes-off messages. All notes off also
+        # covers notes that weren't tracked, like the ones passed through.
+        # STOP itself was already passed on by the MIDI callback.
+        silence(port=self.note_output, stop=False, channels=[self.out_channel])
         self.notes_down.clear()
         self.notes_sustained.clear()
+        self.notes_changed.set()
 
-    async def mod_wheel(self, value: int) -> None:
+    def mod_wheel(self, value: int) -> None:
         if self.last_mod == value:
             return
         self.last_mod = value
-        await self.cc(MOD_WHEEL, value)
+        self.cc(MOD_WHEEL, value)
 
-    async def expression(self, value: int) -> None:
+    def expression(self, value: int) -> None:
         if self.last_expr == value:
             return
         self.last_expr = value
-        # await self.cc(FOOT_PEDAL, value)
-        await self.cc(EXPRESSION_PEDAL, value)
-
-    async def note_on_passthrough(self, note: int, velocity: int) -> None:
-        await self.out(NOTE_ON, note, velocity)
-
-    async def note_off_passthrough(self, note: int, velocity: int) -> None:
-        await self.out(NOTE_OFF, note, velocity)
-
-    async def sustain_passthrough(self, value: int) -> None:
-        await self.cc(SUSTAIN_PEDAL, value)
-
-    async def own_note_on(self, note: int, velocity: int) -> None:
-        off = False
-        for i, note_sustained in enumerate(self.notes_sustained):
-            if note_sustained == note:
-                self.notes_sustained.pop(i)
-                off = True
-                break
-        for i, note_down in enumerate(self.notes_down):
-            if note_down == note:
-                self.notes_down.pop(i)
-                off = True
-                break
+        # self.cc(FOOT_PEDAL, value)
+        self.cc(EXPRESSION_PEDAL, value)
+
+    def note_on_passthrough(self, note: int, velocity: int) -> None:
+        self.out_note_on(note, velocity)
+
+    def note_off_passthrough(self, note: int, velocity: int) -> None:
+        self.out_note_off(note, velocity)
+
+    def sustain_passthrough(self, value: int) -> None:
+        self.cc(SUSTAIN_PEDAL, value)
+
+    def own_note_on(self, note: int, velocity: int) -> None:
+        # Read more than once per call, so kept in locals.
+        notes_down = self.notes_down
+        notes_sustained = self.notes_sustained
+        # A note is either down or sustained, never both, so one hit ends the search.
+        off = True
+        if note in notes_down:
+            del notes_down[note]
+        elif note in notes_sustained:
+            del notes_sustained[note]
+        else:
+            off = False
         if off:
-            await self.out(NOTE_OFF, note, 0)
-        while (len(self.notes_sustained) + len(self.notes_down)) >= self.polyphony:
-            if self.notes_sustained:
-                await self.out(NOTE_OFF, self.notes_sustained.pop(0), 0)
+            self.out_note_off(note, 0)
+        polyphony = self.polyphony
+        active = len(notes_sustained) + len(notes_down)
+        while active >= polyphony:
+            if notes_sustained:
+                oldest, _ = notes_sustained.popitem(last=False)
             else:
-                await self.out(NOTE_OFF, self.notes_down.pop(0), 0)
-        self.notes_down.append(note)
-        await self.out(NOTE_ON, note, velocity)
-
-    async def own_note_off(self, note: int, velocity: int) -> None:
-        off = False
-        for i, note_down in enumerate(self.notes_down):
-            if note_down == note:
-                self.notes_down.pop(i)
-                off = True
-                break
+                oldest, _ = notes_down.popitem(last=False)
+            self.out_note_off(oldest, 0)
+            active -= 1
+        notes_down[note] = None
+        self.notes_changed.set()
+        self.out_note_on(note, velocity)
+
+    def own_note_off(self, note: int, velocity: int) -> None:
+        off = note in self.notes_down
+        if off:
+            del self.notes_down[note]
 
         if self.is_sustain:
             off = False
-            for i, note_sustained in enumerate(self.notes_sustained):
-                if note_sustained == note:
-                    self.notes_sustained.pop(i)
-                    break
-            self.notes_sustained.append(note)
+            # Re-sustaining a note moves it to the end, as the most recent one.
+            self.notes_sustained.pop(note, None)
+            self.notes_sustained[note] = None
+        self.notes_changed.set()
 
         if off:
-            await self.out(NOTE_OFF, note, velocity)
+            self.out_note_off(note, velocity)
 
-    async def own_sustain(self, value: int) -> None:
+    def own_sustain(self, value: int) -> None:
         if value == 0:
             self.is_sustain = False
             while self.notes_sustained:
-                await self.out(NOTE_OFF, self.notes_sustained.pop(0), 0)
+                oldest, _ = self.notes_sustained.popitem(last=False)
+                self.out_note_off(oldest, 0)
+            self.notes_changed.set()
         else:
             self.is_sustain = True
 
     # Raw commands
 
-    async def out(self, event: int, note: int, volume: int) -> None:
-        self.note_output.send_message([event | self.out_channel, note, volume])
+    def out(self, event: int, note: int, volume: int) -> None:
+        self._send([event | self.out_channel, note, volume])
+
+    def out_note_on(self, note: int, velocity: int) -> None:
+        message = self._note_on_message
+        message[1] = note
+        message[2] = velocity
+        self._send(message)
 
-    async def at(self, note: int, value: int) -> None:
-        self.note_output.send_message([POLY_AFTERTOUCH | self.out_channel, note, value])
+    def out_note_off(self, note: int, velocity: int) -> None:
+        message = self._note_off_message
+        message[1] = note
+        message[2] = velocity
+        self._send(message)
 
-    async def cc(self, type: int, value: int) -> None:
-        self.note_output.send_message([CONTROL_CHANGE | self.out_channel, type, value])
+    def at(self, note: int, value: int) -> None:
+        message = self._at_message
+        message[1] = note
+        message[2] = value
+        self._send(message)
+
+    def cc(self, type: int, value: int) -> None:
+        message = self._cc_message
+        message[1] = type
+        message[2] = value
+        self._send(message)
 
 
 @click.command()
@@ -380,16 +488,17 @@ def main(config: str, make_config: bool) -> None:
             print(f.read())
         return
 
-    if not DEBUG:
-        uvloop.install()
+    # uvloop.run() creates its loop directly instead of going through the
+    # deprecated event loop policy. DEBUG runs keep the default asyncio loop.
+    run = asyncio.run if DEBUG else run_event_loop
     print(os.getpid())
     with profiling.maybe(DEBUG):
-        asyncio.run(async_main(config))
+        run(async_main(config))
 
 
 async def async_main(config: str) -> None:
-    queue: asyncio.Queue[MidiMessage] = asyncio.Queue(maxsize=256)
     loop = asyncio.get_running_loop()
+    queue = MidiQueue(loop)
 
     cfg = configparser.ConfigParser()
     cfg.read(config)
@@ -403,18 +512,6 @@ async def async_main(config: str) -> None:
         click.secho(f"from-ableton port {port} not connected", fg="red", err=True)
         raise click.Abort from None
 
-    def midi_callback(msg, data=None):
-        sent_time = time.time()
-        midi_message, event_delta = msg
-        try:
-            loop.call_soon_threadsafe(
-                queue.put_nowait, (midi_message, event_delta, sent_time)
-            )
-        except BaseException as be:
-            click.secho(f"callback exc: {type(be)} {be}", fg="red", err=True)
-
-    note_input.set_callback(midi_callback)
-
     if cfg["note-input"]["port-name"] != cfg["note-output"]["port-name"]:
         while True:
             try:
@@ -433,6 +530,30 @@ async def async_main(config: str) -> None:
         catch_damper=cfg["note-input"].getboolean("catch-damper"),
         polyphony=cfg["note-output"].getint("polyphony"),
     )
+    realtime_messages = performance.realtime_messages
+    send = performance.note_output.send_message
+
+    def midi_callback(msg, data=None):
+        midi_message, event_delta = msg
+        try:
+            status = midi_message[0]
+            if forwarded := realtime_messages.get(status):
+                # Clock messages are most of the traffic and only get passed on, so
+                # they go out right from rtmidi's thread instead of waiting for the
+                # event loop. START, CONTINUE, and STOP go out the same way so they
+                # can't fall behind or get ahead of the clock ticks around them.
+                # `send_message()` runs entirely under the GIL so it can't
+                # interleave with a send from the event loop.
+                send(forwarded)
+                if status == CLOCK:
+                    return
+
+            queue.put_threadsafe((midi_message, event_delta, time.perf_counter()))
+        except BaseException as be:
+            click.secho(f"callback exc: {type(be)} {be}", fg="red", err=True)
+
+    note_input.set_callback(midi_callback)
+
     grid_app = MIDIMonitorGridApp(performance)
     try:
         async with asyncio.TaskGroup() as tg:
@@ -458,7 +579,7 @@ async def async_main(config: str) -> None:
         silence(note_output)
 
 
-async def stress_test(queue: asyncio.Queue[MidiMessage]) -> None:
+async def stress_test(queue: MidiQueue) -> None:
     i = 0
     while True:
         i += 1
@@ -468,79 +589,94 @@ async def stress_test(queue: asyncio.Queue[MidiMessage]) -> None:
             msg = [176, 64, 0]
         else:
             msg = [176, 4, i % 128]
-        await queue.put((msg, 0, time.time()))
+        queue.put_threadsafe((msg, 0, time.perf_counter()))
         if i % 10000 == 0:
             await asyncio.sleep(3)
         else:
             await asyncio.sleep(0.001)
 
 
-async def midi_consumer(
-    queue: asyncio.Queue[MidiMessage], performance: Performance
-) -> None:
+async def midi_consumer(queue: MidiQueue, performance: Performance) -> None:
     print("Waiting for MIDI messages...")
     silence(performance.note_output, channels=[performance.out_channel])
-    system_realtime = {START, STOP, SONG_POSITION}
+    system_realtime = {START, CONTINUE, STOP, SONG_POSITION}
     notes = {NOTE_ON, NOTE_OFF}
     handled_types = system_realtime | notes | {CONTROL_CHANGE}
     in_ch = performance.in_channel - 1
+    trace = TRACE
+
+    def all_notes_off(value: int) -> None:
+        performance.cc(ALL_NOTES_OFF, value)
+        performance.cc(SUSTAIN_PEDAL, 0)
+
+    def all_sound_off(value: int) -> None:
+        performance.cc(ALL_SOUND_OFF, value)
+        performance.cc(SUSTAIN_PEDAL, 0)
+
+    # One dictionary lookup per message instead of a chain of comparisons.
+    channel_handlers: dict[int, Callable[[int, int], None]] = {
+        NOTE_ON: performance.note_on,
+        NOTE_OFF: performance.note_off,
+        POLY_AFTERTOUCH: performance.at,
+        PITCH_BEND: partial(performance.out, PITCH_BEND),
+    }
+    cc_handlers: dict[int, Callable[[int], None]] = {
+        MOD_WHEEL: performance.mod_wheel,
+        FOOT_PEDAL: performance.expression,
+        EXPRESSION_PEDAL: performance.expression,
+        SUSTAIN_PEDAL: performance.sustain,
+        ALL_NOTES_OFF: all_notes_off,
+        ALL_SOUND_OFF: all_sound_off,
+    }
+    for cc in MODULATION_CC:
+        cc_handlers[cc] = partial(performance.cc, cc)
+    system_handlers: dict[int, Callable[[], None]] = {
+        STOP: performance.stop,
+    }
+
     while True:
-        msg, delta, sent_time = await queue.get()
-        latency = time.time() - sent_time
-        t = msg[0]
-        if t == CLOCK:
-            performance.clock_eager()
-            continue
-
-        st = t & STRIP_CHANNEL
-        if st == STRIP_CHANNEL:  # system realtime message didn't have a channel
-            st = t
-        elif t & GET_CHANNEL != in_ch:
-            click.secho(f"skipping {msg} not on channel {in_ch}: {t & GET_CHANNEL}")
-            continue
-
-        if __debug__:
-            fg = "white"
-            if st in system_realtime:
-                fg = "blue"
+        # A burst of messages is handled in one go instead of one event loop
+        # iteration each.
+        batch = await queue.get_batch()
+        last = len(batch) - 1
+        for i, (msg, delta, sent_time) in enumerate(batch):
+            t = msg[0]
+            # A controller moving again right away only needs its newest value.
+            if i < last and t & STRIP_CHANNEL == CONTROL_CHANGE:
+                next_msg = batch[i + 1][0]
+                cc = msg[1]
+                if next_msg[0] == t and next_msg[1] == cc and cc in CONTINUOUS_CC:
+                    continue
+
+            st = t & STRIP_CHANNEL
+            if st == STRIP_CHANNEL:  # system realtime message didn't have a channel
+                st = t
+            elif t & GET_CHANNEL != in_ch:
+                click.secho(f"skipping {msg} not on channel {in_ch}: {t & GET_CHANNEL}")
+                continue
+
+            if trace:
+                latency = time.perf_counter() - sent_time
+                fg = "white"
+                if st in system_realtime:
+                    fg = "blue"
+                elif st == CONTROL_CHANGE:
+                    fg = "green"
+                elif st == POLY_AFTERTOUCH:
+                    fg = "magenta"
+                click.secho(
+                    f"{msg}\tevent delta: {delta:.4f}\tlatency: {latency:.4f}", fg=fg
+                )
+            if handler := channel_handlers.get(st):
+                handler(msg[1], msg[2])
             elif st == CONTROL_CHANGE:
-                fg = "green"
-            elif st == POLY_AFTERTOUCH:
-                fg = "magenta"
-            click.secho(
-                f"{msg}\tevent delta: {delta:.4f}\tlatency: {latency:.4f}", fg=fg
-            )
-        if st == START:
-            await performance.start()
-        elif st == STOP:
-            await performance.stop()
-        elif st == NOTE_ON:
-            await performance.note_on(msg[1], msg[2])
-        elif st == NOTE_OFF:
-            await performance.note_off(msg[1], msg[2])
-        elif st == POLY_AFTERTOUCH:
-            await performance.at(msg[1], msg[2])
-        elif st == CONTROL_CHANGE:
-            if msg[1] == MOD_WHEEL:
-                await performance.mod_wheel(msg[2])
-            elif msg[1] == FOOT_PEDAL or msg[1] == EXPRESSION_PEDAL:
-                await performance.expression(msg[2])
-            elif msg[1] == SUSTAIN_PEDAL:
-                await performance.sustain(msg[2])
-            elif msg[1] in MODULATION_CC:
-                await performance.cc(msg[1], msg[2])
-            elif msg[1] == ALL_NOTES_OFF:
-                await performance.cc(ALL_NOTES_OFF, msg[2])
-                await performance.cc(SUSTAIN_PEDAL, 0)
-            elif msg[1] == ALL_SOUND_OFF:
-                await performance.cc(ALL_SOUND_OFF, msg[2])
-                await performance.cc(SUSTAIN_PEDAL, 0)
-            else:
-                print(f"warning: unhandled CC {msg[1]}", file=sys.stderr)
-        elif st == PITCH_BEND:
-            await performance.out(PITCH_BEND, msg[1], msg[2])
-        else:
-            if st not in handled_types:
+                if cc_handler := cc_handlers.get(msg[1]):
+                    cc_handler(msg[2])
+                else:
+                    print(f"warning: unhandled CC {msg[1]}", file=sys.stderr)
+            elif system_handler := system_handlers.get(st):
+                system_handler()
+            elif st not in handled_types:
                 print(f"warning: unhandled event {msg}", file=sys.stderr)
 
 
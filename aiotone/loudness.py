@@ -5,10 +5,37 @@ from pathlib import Path
 import sys
 
 import click
-import pyloudnorm as pyln
+import numpy as np
+
+try:
+    import pyebur128
+except ImportError:  # optional, measures in C
+    pyebur128 = None
+    import pyloudnorm as pyln
 
 from aiotone import audiofile
 
+BLOCK_DURATION = 0.4  # seconds, the gating block length of ITU-R BS.1770
+
+
+def integrated_loudness(path: Path, quiet: bool = False) -> tuple[float, int]:
+    """Return the integrated loudness of `path` in LUFS, and its sample rate.
+
+    pyebur128 measures the file block by block as it's read, so it's never
+    in memory whole. pyloudnorm needs all samples at once.
+    """
+    if pyebur128 is not None:
+        rate, channels, blocks = audiofile.read_blocks(path, BLOCK_DURATION, quiet)
+        state = pyebur128.R128State(channels, rate, pyebur128.MeasurementMode.MODE_I)
+        for block in blocks:
+            # libebur128 takes interleaved frames, which is how blocks are laid out.
+            frames = np.ascontiguousarray(block, dtype=np.float64)
+            state.add_frames(frames.reshape(-1), len(frames))
+        return pyebur128.get_loudness_global(state), rate
+
+    data, rate = audiofile.read(path, quiet)
+    return pyln.Meter(rate).integrated_loudness(data), rate
+
 
 @click.command()
 @click.option("--quiet", is_flag=True, default=False)
@@ -17,9 +44,7 @@ def main(quiet: bool, file: list[str]) -> None:
     for f in file:
         p = Path(f)
         if p.is_file():
-            data, rate = audiofile.read(p, quiet)
-            meter = pyln.Meter(rate)
-            loudness = meter.integrated_loudness(data)
+            loudness, rate = integrated_loudness(p, quiet)
             print(f"{p} ({rate / 1000:.1f} kHz)  =  {loudness:.3f}")
         else:
             print(f"{p} does not exist", file=sys.stderr)
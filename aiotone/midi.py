@@ -19,6 +19,7 @@ SYSEX_RT = 0b11111000
 PANIC = 0b11111111
 CLOCK = 0b11111000
 START = 0b11111010
+CONTINUE = 0b11111011
 STOP = 0b11111100
 SONG_POSITION = 0b11110010
 
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import os
+
+
+def promote_current_thread(priority: int | None = None) -> bool:
+    """Ask the OS to schedule the calling thread with realtime (FIFO) priority.
+
+    Use it from threads that audio or MIDI latency depends on, like callbacks
+    invoked by miniaudio or rtmidi.  Only supported on Linux and only when the
+    process is allowed to (CAP_SYS_NICE or a sufficient `ulimit -r`).  Returns
+    whether the promotion succeeded; failures are otherwise silent.
+
+    Without a `priority`, a thread that already runs with a realtime policy, like
+    one the audio backend or rtkit promoted, is left alone instead of being moved
+    to the lowest FIFO priority.
+    """
+    if not hasattr(os, "sched_setscheduler"):
+        return False
+
+    if priority is None:
+        # On Linux, pid 0 refers to the calling thread, not the whole process.
+        if os.sched_getscheduler(0) in (os.SCHED_FIFO, os.SCHED_RR):
+            return True
+
+        priority = os.sched_get_priority_min(os.SCHED_FIFO)
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+    except OSError:
+        return False
+
+    return True
@@ -14,7 +14,11 @@ from attrs import define, field, Factory
 import click
 import numpy as np
 from scipy.interpolate import interp1d
-import uvloop
+
+try:
+    from uvloop import run as run_event_loop
+except ImportError:  # uvloop doesn't support Windows
+    from asyncio import run as run_event_loop
 
 from . import monome
 from .metronome import Metronome
@@ -53,6 +57,7 @@ MidiMessage = Tuple[MidiPacket, EventDelta, TimeStamp]
 
 
 CURRENT_DIR = Path(__file__).parent
+LED_FRAME_INTERVAL = 0.03  # seconds between grid redraws
 CONFIGPARSER_FALSE = {
     k
     for k, v in configparser.ConfigParser.BOOLEAN_STATES.items()  # type: ignore
@@ -61,6 +66,11 @@ CONFIGPARSER_FALSE = {
 SUSTAIN_PEDAL_PORTAMENTO = {"sustain", "damper"}
 PORTAMENTO_MODES = {"legato"} | SUSTAIN_PEDAL_PORTAMENTO | CONFIGPARSER_FALSE
 WHITE_KEYS = {0, 2, 4, 5, 7, 9, 11}
+# Grid LED levels for the keyboard drawn on the first 12 columns, indexed [x][y].
+# Each row is an octave, the lowest one at the bottom.
+KEYBOARD_LEDS = np.zeros(16, dtype=(">i", 8))
+KEYBOARD_LEDS[:12] = 1
+KEYBOARD_LEDS[sorted(WHITE_KEYS)] = 2
 
 
 class NoteMode(Enum):
@@ -109,17 +119,22 @@ class MIDIMonitorGridApp(monome.GridApp):
         pass
 
     async def handle_leds(self) -> None:
+        loop = asyncio.get_running_loop()
         fps = 0
-        last_sec = time.monotonic()
+        last_sec = next_frame = loop.time()
         while True:
             fps += 1
             self.draw()
-            now = time.monotonic()
+            now = loop.time()
             if now - last_sec >= 1:
                 self.performance.render_fps = fps / (now - last_sec)
                 fps = 0
                 last_sec = now
-            await asyncio.sleep(0.03)
+            # Sleep until the next frame is due rather than a fixed amount so the
+            # time `draw()` takes doesn't slow the refresh rate down. After a stall
+            # pick up from now instead of drawing the missed frames in a burst.
+            next_frame = max(next_frame + LED_FRAME_INTERVAL, now)
+            await asyncio.sleep(next_frame - now)
 
     async def run(self) -> None:
         try:
@@ -134,27 +149,17 @@ class MIDIMonitorGridApp(monome.GridApp):
             return
 
         leds = self._leds
-        leds[:] = 0
-        notes = self.performance.notes
-        for y in range(0, 8):
-            for x in range(0, 12):
-                match notes.get(12 * (9 - y) + x):
-                    case NoteMode.REGULAR | NoteMode.POWER:
-                        leds[x][y] = 15
-                    case NoteMode.RED:
-                        leds[x][y] = 15
-                    case NoteMode.BLUE:
-                        leds[x][y] = 11
-                    case None:
-                        leds[x][y] = 2 if x in WHITE_KEYS else 1
+        leds[:] = KEYBOARD_LEDS
+        for note, mode in self.performance.notes.items():
+            y = 9 - note // 12
+            if 0 <= y < 8:
+                leds[note % 12][y] = 11 if mode is NoteMode.BLUE else 15
 
         b = self._buffer
         for x_offset in range(0, self.width, 8):
             for y_offset in range(0, self.height, 8):
-                b[:] = 0
-                for x in range(8):
-                    for y in range(8):
-                        b[y][x] = leds[x_offset + x][y_offset + y]
+                # Grid maps are row-major, `leds` is indexed [x][y].
+                b[:] = leds[x_offset : x_offset + 8, y_offset : y_offset + 8].T
                 self.grid.led_level_map_raw(x_offset, y_offset, b)
 
     def disconnect(self) -> None:
@@ -553,8 +558,7 @@ def main(config: str, make_config: bool) -> None:
             print(f.read())
         return
 
-    uvloop.install()
-    asyncio.run(async_main(config))
+    run_event_loop(async_main(config))
 
 
 async def async_main(config: str) -> None:
@@ -15,7 +15,11 @@ import time
 
 from attr import dataclass, Factory
 import click
-import uvloop
+
+try:
+    from uvloop import run as run_event_loop
+except ImportError:  # uvloop doesn't support Windows
+    from asyncio import run as run_event_loop
 
 from .metronome import Metronome
 from .midi import (
@@ -309,8 +313,7 @@ def main(config: str, make_config: bool) -> None:
             print(f.read())
         return
 
-    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
-    asyncio.run(async_main(config))
+    run_event_loop(async_main(config))
 
 
 async def async_main(config: str) -> None:
@@ -7,6 +7,8 @@ from typing import *
 from array import array
 import math
 
+import numpy as np
+
 
 # We want this to be symmetrical on the + and the - side.
 INT16_MAXVALUE = 32767
@@ -14,11 +16,10 @@ INT16_MAXVALUE = 32767
 
 def sine_array(sample_count: int) -> array[int]:
     """Return a monophonic signed 16-bit wavetable with a single sine cycle."""
-    numbers = []
-    for i in range(sample_count):
-        current = round(INT16_MAXVALUE * math.sin(i / sample_count * math.tau))
-        numbers.append(current)
-    return array("h", numbers)
+    wave = _phases(sample_count)
+    np.sin(wave, out=wave)
+    wave *= INT16_MAXVALUE
+    return _to_array(wave)
 
 
 def sine12_array(sample_count: int) -> array[int]:
@@ -26,17 +27,12 @@ def sine12_array(sample_count: int) -> array[int]:
 
     A 1+2 sine is a sine wave modulated by its first harmonic.
     """
-    numbers = []
-    for i in range(sample_count):
-        current = round(
-            INT16_MAXVALUE
-            * (
-                0.5 * math.sin(i / sample_count * math.tau)
-                + 0.5 * math.sin(2 * i / sample_count * math.tau)
-            )
-        )
-        numbers.append(current)
-    return array("h", numbers)
+    phase = _phases(sample_count)
+    wave = np.sin(phase)
+    phase *= 2
+    wave += np.sin(phase, out=phase)
+    wave *= 0.5 * INT16_MAXVALUE
+    return _to_array(wave)
 
 
 def saw_array(sample_count: int) -> array[int]:
@@ -44,15 +40,10 @@ def saw_array(sample_count: int) -> array[int]:
 
     The wave cycle is in phase with the sines produced by `sine_array` et al.
     """
-    numbers = []
-    for i in range(sample_count // 2):
-        current = round((i / sample_count) * (2 * INT16_MAXVALUE))
-        numbers.append(current)
-    for i in range(sample_count // 2):
-        current = round(-INT16_MAXVALUE + (i / sample_count) * (2 * INT16_MAXVALUE))
-        numbers.append(current)
+    ramp = np.arange(sample_count // 2) / sample_count * (2 * INT16_MAXVALUE)
+    numbers = np.concatenate((ramp, -INT16_MAXVALUE + ramp))
     assert len(numbers) == sample_count
-    return array("h", numbers)
+    return _to_array(numbers)
 
 
 def pulse_array(sample_count: int) -> array[int]:
@@ -64,6 +55,23 @@ def pulse_array(sample_count: int) -> array[int]:
     return array("h", [INT16_MAXVALUE] * half + [-INT16_MAXVALUE] * half)
 
 
+def _phases(sample_count: int) -> np.ndarray:
+    """Return the phase in radians of each sample in a single cycle, as float64."""
+    phase = np.arange(sample_count, dtype=np.float64)
+    phase /= sample_count
+    phase *= math.tau
+    return phase
+
+
+def _to_array(values: np.ndarray) -> array[int]:
+    """Round `values` half to even, like `round()`, into a signed 16-bit array.
+
+    Rounds in place, `values` is a scratch array.
+    """
+    np.round(values, out=values)
+    return array("h", values.astype(np.int16).tobytes())
+
+
 def _plot_arrays(*arrays: Tuple[array[int], str]) -> None:
     from scipy import signal
     import matplotlib.pyplot as plt
@@ -0,0 +1,75 @@
+from array import array
+
+import numpy as np
+import pytest
+
+array_perf = pytest.importorskip("aiotone.array_perf")
+
+
+def interleaved(frames: int, channels: int) -> np.ndarray:
+    rng = np.random.default_rng(frames * channels)
+    return rng.uniform(-1.0, 1.0, (frames, channels)).astype(np.float32)
+
+
+@pytest.mark.parametrize(
+    "channels, in_l, in_r, out_l, out_r",
+    [
+        (2, 0, 1, 0, 1),
+        (2, 1, 0, 0, 1),
+        (4, 2, 3, 0, 1),
+        (4, 3, 0, 1, 2),
+        (6, 4, 5, 2, 3),
+        (3, 1, 1, 2, 0),
+    ],
+)
+@pytest.mark.parametrize("frames", [0, 1, 13, 64])
+def test_route_audio(
+    channels: int, in_l: int, in_r: int, out_l: int, out_r: int, frames: int
+) -> None:
+    samples = interleaved(frames, channels)
+    # Read-only, like the bytes miniaudio passes to a stream.
+    in_buffer = memoryview(samples.tobytes()).cast("f")
+    out_buffer = array("f", [9.0] * (frames * channels + channels))
+    channel_sum = array("f", [9.0] * channels)
+
+    array_perf.route_audio(in_buffer, in_l, in_r, out_buffer, out_l, out_r, channel_sum)
+
+    expected = np.zeros_like(samples)
+    expected[:, out_l] = samples[:, in_l]
+    expected[:, out_r] = samples[:, in_r]
+    routed = np.frombuffer(out_buffer, dtype=np.float32)
+    assert routed[: frames * channels].tolist() == expected.reshape(-1).tolist()
+    # Only as much of `out_buffer` as `in_buffer` holds is written.
+    assert routed[frames * channels :].tolist() == [9.0] * channels
+    np.testing.assert_allclose(channel_sum, samples.sum(axis=0), atol=1e-5)
+
+
+@pytest.mark.parametrize(
+    "in_l, in_r, out_l, out_r",
+    [(-1, 1, 0, 1), (0, 2, 0, 1), (0, 1, -1, 1), (0, 1, 0, 2)],
+)
+def test_route_audio_checks_channels(
+    in_l: int, in_r: int, out_l: int, out_r: int
+) -> None:
+    in_buffer = array("f", interleaved(8, 2).reshape(-1).tolist())
+    out_buffer = array("f", [9.0] * 16)
+    channel_sum = array("f", [0.0, 0.0])
+    with pytest.raises(ValueError):
+        array_perf.route_audio(
+            in_buffer, in_l, in_r, out_buffer, out_l, out_r, channel_sum
+        )
+    assert out_buffer.tolist() == [9.0] * 16
+
+
+def test_route_audio_checks_lengths() -> None:
+    in_buffer = array("f", interleaved(8, 2).reshape(-1).tolist())
+    channel_sum = array("f", [0.0, 0.0])
+    short = array("f", [9.0] * 15)
+    with pytest.raises(ValueError):
+        array_perf.route_audio(in_buffer, 0, 1, short, 0, 1, channel_sum)
+    assert short.tolist() == [9.0] * 15
+    # A partial frame at the end.
+    with pytest.raises(ValueError):
+        array_perf.route_audio(
+            in_buffer[:15], 0, 1, array("f", [0.0] * 16), 0, 1, channel_sum
+        )
@@ -0,0 +1,253 @@
+from array import array
+
+import numpy as np
+import pytest
+
+fm = pytest.importorskip("aiotone.fm")
+
+SAMPLE_RATE = 48000
+WAVETABLE_SIZE = 2048
+# Modulators of op3, op2, and op1 and the carriers summed into the output, for each
+# algorithm in `PhaseModulator`'s docstring. Empty modulators mean unmodulated.
+ROUTINGS = [
+    (((4,), (3,), (2,)), (1,)),
+    (((), (3, 4), (2,)), (1,)),
+    (((), (3,), (2,)), (1,)),
+    (((4,), (4,), (2,)), (1,)),
+    (((), (), (2, 3, 4)), (1,)),
+    (((4,), (3,), ()), (1, 2)),
+    (((4,), (3,), (3,)), (1, 2)),
+    (((), (4,), (3,)), (1, 2)),
+    (((4,), (4,), (4,)), (1, 2, 3)),
+    (((4,), (4,), ()), (1, 2, 3)),
+    (((4,), (), ()), (1, 2, 3)),
+    (((), (), ()), (1, 2, 3, 4)),
+]
+
+
+def random_mono(rng: np.random.Generator, frames: int) -> array:
+    return array("h", rng.integers(-32767, 32768, frames, dtype=np.int16).tobytes())
+
+
+@pytest.mark.parametrize("voices", [1, 2, 3, 8])
+@pytest.mark.parametrize("frames", [1, 7, 256, 513])
+def test_mix_stereo(voices: int, frames: int) -> None:
+    rng = np.random.default_rng(voices * 1000 + frames)
+    monos = [random_mono(rng, frames) for _ in range(voices)]
+    gains = [fm.pan_gains(pan, 0.5) for pan in np.linspace(-1.0, 1.0, voices)]
+    out = array("f", [0.0] * 2 * frames)
+
+    fm.mix_stereo(monos, gains, out, frames)
+
+    expected = np.zeros((frames, 2))
+    for mono, (left, right) in zip(monos, gains):
+        samples = np.frombuffer(mono, dtype=np.int16)
+        expected[:, 0] += samples * left
+        expected[:, 1] += samples * right
+    expected = np.clip(expected, -1.0, 1.0).reshape(-1)
+    np.testing.assert_allclose(
+        np.frombuffer(out, dtype=np.float32), expected, atol=1e-5
+    )
+
+
+def test_mix_stereo_count() -> None:
+    rng = np.random.default_rng(0)
+    monos = [random_mono(rng, 16) for _ in range(3)]
+    gains = [fm.pan_gains(0.0)] * 3
+    out = array("f", [0.0] * 32)
+    expected = array("f", [0.0] * 32)
+
+    fm.mix_stereo(monos, gains, out, 16, 2)
+    fm.mix_stereo(monos[:2], gains[:2], expected, 16)
+
+    assert out == expected
+
+
+def test_mix_stereo_checks_lengths() -> None:
+    mono = array("h", [0] * 16)
+    gains = [fm.pan_gains(0.0)]
+    with pytest.raises(ValueError):
+        fm.mix_stereo([mono], gains, array("f", [0.0] * 31), 16)
+    with pytest.raises(ValueError):
+        fm.mix_stereo([mono], gains, array("f", [0.0] * 34), 17)
+    with pytest.raises(ValueError):
+        fm.mix_stereo([mono], gains, array("f", [0.0] * 32), 16, 2)
+
+
+@pytest.mark.parametrize("pan", [-1.0, -0.6, 0.0, 0.25, 0.9, 1.0])
+@pytest.mark.parametrize("frames", [1, 7, 9, 15, 17, 63])
+def test_calculate_panning(pan: float, frames: int) -> None:
+    rng = np.random.default_rng(frames)
+    mono = random_mono(rng, frames)
+    stereo = array("h", [0] * 2 * frames)
+
+    fm.calculate_panning(pan, mono, stereo, frames)
+
+    # The scalar loop's Q15 arithmetic over the whole signal.
+    samples = np.frombuffer(mono, dtype=np.int16).astype(np.int32)
+    if pan == 0.0:
+        left = right = (np.abs(samples) // 2) * np.sign(samples)
+    elif pan == -1.0:
+        left, right = samples, np.zeros_like(samples)
+    elif pan == 1.0:
+        left, right = np.zeros_like(samples), samples
+    else:
+        left_gain = int(np.floor((-pan + 1) / 2 * 32768 + 0.5))
+        right_gain = min(32768 - left_gain, 32767)
+        left_gain = min(left_gain, 32767)
+        left = (samples * left_gain + 16384) >> 15
+        right = (samples * right_gain + 16384) >> 15
+    expected = np.stack([left, right], axis=1).reshape(-1).astype(np.int16)
+    assert np.frombuffer(stereo, dtype=np.int16).tolist() == expected.tolist()
+
+
+@pytest.mark.parametrize("frames", [1, 3, 5, 7, 9, 17, 63])
+def test_calculate_auto_panning(frames: int) -> None:
+    rng = np.random.default_rng(frames)
+    mono = random_mono(rng, frames)
+    panning = array("h", rng.integers(-32767, 32768, frames, dtype=np.int16).tobytes())
+    stereo = array("h", [0] * 2 * frames)
+
+    fm.calculate_auto_panning(mono, panning, stereo, frames)
+
+    # The scalar loop's double precision arithmetic over the whole signal.
+    samples = np.frombuffer(mono, dtype=np.int16).astype(np.float64)
+    pan = np.frombuffer(panning, dtype=np.int16) * (1.0 / 32767)
+    left = np.trunc((-pan + 1) / 2 * samples)
+    right = np.trunc((pan + 1) / 2 * samples)
+    expected = np.stack([left, right], axis=1).reshape(-1).astype(np.int16)
+    assert np.frombuffer(stereo, dtype=np.int16).tolist() == expected.tolist()
+
+
+def make_operators() -> list:
+    t = np.arange(WAVETABLE_SIZE) / WAVETABLE_SIZE
+    wave = array("h", np.round(32767 * np.sin(2 * np.pi * t)).astype(np.int16))
+    operators = []
+    for rate in (1.0, 2.0, 0.5, 3.0):
+        envelope = fm.Envelope(a=40, d=90, s=0.7, r=120)
+        operator = fm.Operator(wave, SAMPLE_RATE, envelope, volume=1.0)
+        operator.note_on(220.0 * rate, 1.0)
+        operators.append(operator)
+    return operators
+
+
+def saturating_sum(signals: list, frames: int) -> array:
+    total = sum(
+        np.frombuffer(s, dtype=np.int16)[:frames].astype(np.int32) for s in signals
+    )
+    return array("h", np.clip(total, -32767, 32767).astype(np.int16).tobytes())
+
+
+def render_routing(algorithm: int, operators: list, frames: int) -> list[int]:
+    """Render `algorithm` by calling `Operator.render()` for each operator."""
+    modulators, carriers = ROUTINGS[algorithm]
+    outs = {4: array("h", [0] * frames)}
+    operators[3].render(outs[4], None, frames)
+    for number, sources in zip((3, 2, 1), modulators):
+        outs[number] = array("h", [0] * frames)
+        modulator = (
+            saturating_sum([outs[s] for s in sources], frames) if sources else None
+        )
+        operators[number - 1].render(outs[number], modulator, frames)
+    return saturating_sum([outs[c] for c in carriers], frames).tolist()
+
+
+@pytest.mark.parametrize("algorithm", [*range(12), -7, -1, 12, 100])
+def test_render_algorithm(algorithm: int) -> None:
+    operators = make_operators()
+    reference = make_operators()
+    buffers = tuple(array("h", [0] * 300) for _ in range(5))
+    routing = algorithm if 0 <= algorithm <= 10 else 11
+
+    # Block sizes don't divide the envelope stages, release starts mid-way.
+    for block, frames in enumerate([1, 37, 256, 300, 113, 300, 300]):
+        if block == 4:
+            for operator in operators + reference:
+                operator.note_off(0.0, 0.0)
+        out = fm.render_algorithm(algorithm, *operators, buffers, frames)
+        assert out[:frames].tolist() == render_routing(routing, reference, frames)
+
+    with pytest.raises(ValueError):
+        fm.render_algorithm(algorithm, *operators, buffers, 301)
+    with pytest.raises(ValueError):
+        fm.render_algorithm(algorithm, *operators, buffers[:4], 300)
+
+
+class Voice:
+    """The attributes of `PhaseModulator` that `render_voices()` reads."""
+
+    def __init__(self, algorithm: int) -> None:
+        self.algorithm = algorithm
+        self.op1, self.op2, self.op3, self.op4 = make_operators()
+        self._buffers = tuple(array("h", [0] * 300) for _ in range(5))
+
+    def render(self, frames: int) -> list[int]:
+        ops = (self.op1, self.op2, self.op3, self.op4)
+        out = fm.render_algorithm(self.algorithm, *ops, self._buffers, frames)
+        return out[:frames].tolist()
+
+
+def test_render_voices() -> None:
+    algorithms = [0, 7, 11]
+    voices = [Voice(algorithm) for algorithm in algorithms]
+    reference = [Voice(algorithm) for algorithm in algorithms]
+    active = bytearray([1, 0, 1])
+    gains = (fm.pan_gains(-0.5, 0.8), fm.pan_gains(0.0), fm.pan_gains(1.0, 0.3))
+    out = array("f", [0.0] * 600)
+
+    for frames in (1, 37, 300):
+        assert fm.render_voices(voices, active, gains, out, frames) == 2
+
+        expected = np.zeros((frames, 2))
+        for voice, is_active, (left, right) in zip(reference, active, gains):
+            if is_active:
+                samples = np.array(voice.render(frames))
+                expected[:, 0] += samples * left
+                expected[:, 1] += samples * right
+        expected = np.clip(expected, -1.0, 1.0).reshape(-1)
+        np.testing.assert_allclose(
+            np.frombuffer(out, dtype=np.float32)[: 2 * frames], expected, atol=1e-5
+        )
+
+    # Inactive voices aren't rendered, so the skipped one still sounds like new.
+    assert voices[1]._buffers[0].tolist() == [0] * 300
+    fresh = Voice(voices[1].algorithm)
+    for frames in (1, 300):
+        assert voices[1].render(frames) == fresh.render(frames)
+
+    with pytest.raises(ValueError):
+        fm.render_voices(voices, active[:2], gains, out, 300)
+    with pytest.raises(ValueError):
+        fm.render_voices(voices, active, gains, out, 301)
+
+
+@pytest.mark.parametrize("sustain", [0.0, 0.6])
+@pytest.mark.parametrize("frames", [1, 37, 300])
+def test_envelope_blocks(sustain: float, frames: int) -> None:
+    # Operators advance their envelope a block at a time. A constant full-scale
+    # wave makes the output the envelope itself, scaled to int16. Neither stage
+    # lengths nor the release point line up with `frames`.
+    stages = dict(a=100, d=150, s=sustain, r=170)
+    wave = array("h", [32767, 32767])
+    operator = fm.Operator(wave, SAMPLE_RATE, fm.Envelope(**stages))
+    envelope = fm.Envelope(**stages)
+    operator.note_on(440.0, 1.0)
+    out = array("h", [0] * frames)
+    operator.render(out, None, 1)  # picks up the note on
+    envelope.reset()
+
+    rendered: list[int] = []
+    expected: list[float] = []
+    released = False
+    while len(expected) < 1200:
+        if not released and len(expected) >= 420:
+            operator.note_off(440.0, 0.0)
+            envelope.release()
+            released = True
+        operator.render(out, None, frames)
+        rendered.extend(out)
+        expected.extend(envelope.advance() for _ in range(frames))
+
+    np.testing.assert_allclose(rendered, np.trunc(np.array(expected) * 32767), atol=1)
+    assert rendered[-1] == 0
+    assert operator.is_silent()
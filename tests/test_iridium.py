@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import pytest
+
+iridium = pytest.importorskip("aiotone.iridium")
+
+from aiotone.midi import NOTE_OFF, NOTE_ON  # noqa: E402
+
+OUT_CHANNEL = 2
+ON = NOTE_ON | OUT_CHANNEL
+OFF = NOTE_OFF | OUT_CHANNEL
+
+
+class RecordingOutput:
+    """Stands in for `MidiOut`, recording every message sent."""
+
+    def __init__(self) -> None:
+        self.messages: list[list[int]] = []
+
+    def send_message(self, message: list[int]) -> None:
+        # Copied because `Performance` reuses its message lists, like rtmidi does.
+        self.messages.append(list(message))
+
+    def take(self) -> list[list[int]]:
+        messages, self.messages = self.messages, []
+        return messages
+
+
+def catch_damper(polyphony: int) -> tuple[iridium.Performance, RecordingOutput]:
+    output = RecordingOutput()
+    performance = iridium.Performance(
+        note_output=output,
+        in_channel=0,
+        out_channel=OUT_CHANNEL,
+        start_stop=False,
+        catch_damper=True,
+        polyphony=polyphony,
+    )
+    return performance, output
+
+
+def test_retrigger_held_note() -> None:
+    performance, output = catch_damper(polyphony=4)
+    performance.note_on(60, 100)
+    performance.note_on(60, 90)
+
+    assert output.take() == [[ON, 60, 100], [OFF, 60, 0], [ON, 60, 90]]
+    assert list(performance.notes_down) == [60]
+
+    performance.note_off(60, 64)
+    assert output.take() == [[OFF, 60, 64]]
+    assert not performance.notes_down
+
+
+def test_note_off_while_sustained() -> None:
+    performance, output = catch_damper(polyphony=4)
+    performance.sustain(127)
+    performance.note_on(60, 100)
+    performance.note_off(60, 64)
+
+    # The pedal holds the note, so its note off isn't sent.
+    assert output.take() == [[ON, 60, 100]]
+    assert list(performance.notes_sustained) == [60]
+
+    # Playing it again stops the sustained voice first.
+    performance.note_on(60, 80)
+    assert output.take() == [[OFF, 60, 0], [ON, 60, 80]]
+    assert list(performance.notes_down) == [60]
+    assert not performance.notes_sustained
+
+
+def test_polyphony_limit_steals_sustained_notes_first() -> None:
+    performance, output = catch_damper(polyphony=3)
+    performance.sustain(127)
+    for note in (60, 62):
+        performance.note_on(note, 100)
+        performance.note_off(note, 0)
+    # Another note off for 60, like the keyboard echoes back, re-sustains it. That
+    # moves it after 62, so 62 is the oldest now.
+    performance.note_off(60, 0)
+    assert list(performance.notes_sustained) == [62, 60]
+    performance.note_on(64, 100)
+    output.take()
+
+    performance.note_on(65, 100)
+    assert output.take() == [[OFF, 62, 0], [ON, 65, 100]]
+    performance.note_on(67, 100)
+    assert output.take() == [[OFF, 60, 0], [ON, 67, 100]]
+    # Only held notes are left, the oldest of them goes.
+    performance.note_on(69, 100)
+    assert output.take() == [[OFF, 64, 0], [ON, 69, 100]]
+    assert list(performance.notes_down) == [65, 67, 69]
+    assert not performance.notes_sustained
+
+
+def test_pedal_release() -> None:
+    performance, output = catch_damper(polyphony=8)
+    performance.sustain(127)
+    for note in (64, 60, 67):
+        performance.note_on(note, 100)
+    performance.note_off(67, 0)
+    performance.note_off(64, 0)
+    output.take()
+
+    # Sustained notes stop oldest first; 60 is still held.
+    performance.sustain(0)
+    assert output.take() == [[OFF, 67, 0], [OFF, 64, 0]]
+    assert list(performance.notes_down) == [60]
+    assert not performance.notes_sustained
+
+    performance.note_off(60, 32)
+    assert output.take() == [[OFF, 60, 32]]
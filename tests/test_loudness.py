@@ -0,0 +1,29 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pyebur128")
+pyln = pytest.importorskip("pyloudnorm")
+sf = pytest.importorskip("soundfile")
+
+from aiotone import loudness  # noqa: E402
+
+
+@pytest.mark.parametrize("channels", [1, 2])
+def test_integrated_loudness_matches_pyloudnorm(tmp_path: Path, channels: int) -> None:
+    rate = 48000
+    rng = np.random.default_rng(channels)
+    t = np.arange(3 * rate) / rate
+    signal = 0.3 * np.sin(2 * np.pi * 440 * t) + 0.05 * rng.standard_normal(len(t))
+    data = np.stack([signal * (c + 1) / channels for c in range(channels)], axis=1)
+    if channels == 1:
+        data = data[:, 0]
+    path = tmp_path / "signal.wav"
+    sf.write(path, data, rate, subtype="FLOAT")
+
+    lufs, measured_rate = loudness.integrated_loudness(path, quiet=True)
+
+    assert measured_rate == rate
+    expected = pyln.Meter(rate).integrated_loudness(sf.read(path)[0])
+    assert lufs == pytest.approx(expected, abs=0.1)